@@ -1,9 +1,10 @@
 import sys
-import os
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout, QRadioButton, QButtonGroup
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout, QRadioButton, QButtonGroup, QSpinBox, QComboBox
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent
-from PIL import Image, ImageOps
+from image_merge_core import (
+    ASPECT_RATIOS, LAYOUT_GRID, LAYOUT_MASONRY, LAYOUT_SHELF, build_layout, merged_path, read_sizes, save_merged,
+)
 
 class ImageMergerApp(QWidget):
     def __init__(self):
@@ -36,8 +37,32 @@ class ImageMergerApp(QWidget):
         self.direction_group.addButton(btn_vertical, 1)
         hbox_direction.addWidget(btn_vertical)
 
+        # グリッド・詰め込み（コンタクトシート）
+        for layout_id, text in ((LAYOUT_GRID, "グリッド"), (LAYOUT_SHELF, "シェルフ"), (LAYOUT_MASONRY, "メイソンリー")):
+            btn = QRadioButton(text, self)
+            self.direction_group.addButton(btn, layout_id)
+            hbox_direction.addWidget(btn)
+
         layout.addLayout(hbox_direction)
 
+        # グリッド・詰め込みのオプション
+        hbox_sheet = QHBoxLayout()
+        hbox_sheet.addWidget(QLabel("列数:", self))
+        self.columns_spin = QSpinBox(self)
+        self.columns_spin.setRange(0, 1000)
+        self.columns_spin.setSpecialValueText("自動")  # 0 = 縦横比から自動で決める（グリッドのみ）
+        hbox_sheet.addWidget(self.columns_spin)
+        hbox_sheet.addWidget(QLabel("縦横比:", self))
+        self.aspect_combo = QComboBox(self)
+        self.aspect_combo.addItems(ASPECT_RATIOS.keys())
+        hbox_sheet.addWidget(self.aspect_combo)
+        hbox_sheet.addWidget(QLabel("セル幅:", self))
+        self.cell_spin = QSpinBox(self)
+        self.cell_spin.setRange(0, 10000)
+        self.cell_spin.setSpecialValueText("元のサイズ")  # 0 = 縮小しない
+        hbox_sheet.addWidget(self.cell_spin)
+        layout.addLayout(hbox_sheet)
+
         # ファイル選択ボタン
         self.btn_select = QPushButton('ファイルを選択', self)
         self.btn_select.clicked.connect(self.open_file_dialog)
@@ -71,40 +96,17 @@ class ImageMergerApp(QWidget):
             print("複数枚の画像を選択してください。")
 
     def merge_images(self):
-        # 連結方向の取得
-        direction = self.direction_group.checkedId()
-        
-        # 画像を読み込む
-        images = [Image.open(img_path) for img_path in self.image_paths]
-        
-        # 最大の幅と高さを取得
-        max_width = max(img.width for img in images)
-        max_height = max(img.height for img in images)
-
-        # 連結する方向に応じてサイズを計算
-        if direction == 0:  # 横方向に連結
-            total_width = sum(img.width for img in images)
-            merged_image = Image.new('RGB', (total_width, max_height), color=(255, 255, 255))
-            x_offset = 0
-            for img in images:
-                # 画像の高さが最大高さと異なる場合、白い余白でパディング
-                padded_img = ImageOps.pad(img, (img.width, max_height), color=(255, 255, 255))
-                merged_image.paste(padded_img, (x_offset, 0))
-                x_offset += img.width
-        else:  # 縦方向に連結
-            total_height = sum(img.height for img in images)
-            merged_image = Image.new('RGB', (max_width, total_height), color=(255, 255, 255))
-            y_offset = 0
-            for img in images:
-                # 画像の幅が最大幅と異なる場合、白い余白でパディング
-                padded_img = ImageOps.pad(img, (max_width, img.height), color=(255, 255, 255))
-                merged_image.paste(padded_img, (0, y_offset))
-                y_offset += img.height
-
-        # 保存先のパスを決定（最初の画像のフォルダに保存）
-        save_dir = os.path.dirname(self.image_paths[0])
-        save_filename = os.path.join(save_dir, f"merged_image_{len(self.image_paths)}.jpg")
-        merged_image.save(save_filename)
+        # 並べ方の取得（0：横方向、1：縦方向、2以降：グリッド・詰め込み）
+        mode = self.direction_group.checkedId()
+
+        # 画像ヘッダのサイズだけからレイアウトを計算（画素はまだ読み込まない）
+        layout = build_layout(
+            read_sizes(self.image_paths), mode, self.columns_spin.value(),
+            ASPECT_RATIOS[self.aspect_combo.currentText()], self.cell_spin.value())
+
+        # 保存先のパスを決定（最初の画像のフォルダに保存。大きいキャンバスは PNG に逐次書き出す）
+        save_filename = merged_path(self.image_paths, layout)
+        save_merged(self.image_paths, layout, save_filename)
         
         print(f"画像を連結して保存しました: {save_filename}")
 
@@ -1,16 +1,69 @@
 import sys
-import os
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout, QRadioButton, QButtonGroup, QMessageBox
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QImage
-from PIL import Image, ImageOps
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout, QRadioButton, QButtonGroup, QSpinBox, QComboBox, QMessageBox
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from image_merge_core import (
+    ASPECT_RATIOS, LAYOUT_GRID, LAYOUT_MASONRY, LAYOUT_SHELF, build_layout, composite, merged_path, read_sizes,
+    save_merged, scale_layout,
+)
+from pil_qt_bridge import pil_to_qimage
+
+# プレビューの表示サイズ
+PREVIEW_SIZE = (400, 300)
+
+# -------------------------------------------------------
+# 連結のワーカースレッド用タスク
+# ・プレビュー：ヘッダからレイアウトを計算し、同じ配置を縮小したサムネイルだけで組み立てる
+#   （JPEG は draft() で縮小デコードされるので、原寸の画素はほとんど展開しない）
+# ・保存：原寸の連結は「決定」を押したときだけ行う
+# -------------------------------------------------------
+class MergeSignals(QObject):
+    finished = pyqtSignal(int, object, str)  # 世代番号, 結果（失敗時None）, エラー内容
+
+class MergePreviewTask(QRunnable):
+    def __init__(self, generation, paths, mode, columns, aspect, cell_width):
+        super().__init__()
+        self.generation = generation
+        self.paths = paths
+        self.options = (mode, columns, aspect, cell_width)
+        self.signals = MergeSignals()
+
+    def run(self):
+        try:
+            layout = build_layout(read_sizes(self.paths), *self.options)
+            preview = composite(self.paths, scale_layout(layout, PREVIEW_SIZE))
+            result = (layout, pil_to_qimage(preview))  # QPixmap への変換はGUIスレッドで行う
+        except Exception as e:
+            self.signals.finished.emit(self.generation, None, str(e))
+            return
+        self.signals.finished.emit(self.generation, result, "")
+
+class SaveMergedTask(QRunnable):
+    def __init__(self, generation, paths, layout):
+        super().__init__()
+        self.generation = generation
+        self.paths = paths
+        self.layout = layout
+        self.signals = MergeSignals()
+
+    def run(self):
+        try:
+            save_filename = merged_path(self.paths, self.layout)
+            save_merged(self.paths, self.layout, save_filename)
+        except Exception as e:
+            self.signals.finished.emit(self.generation, None, str(e))
+            return
+        self.signals.finished.emit(self.generation, save_filename, "")
 
 class ImageMergerApp(QWidget):
     def __init__(self):
         super().__init__()
         self.initUI()
         self.image_paths = []
-        self.merged_image = None  # 連結後の画像を保存
+        self.layout_info = None  # 連結のレイアウト（キャンバスサイズ, 各画像の配置）。原寸の画像は保存時に作る
+        self.merge_generation = 0  # 連結し直すたびに増やし、古いプレビュー結果を捨てる
+        self.merge_pool = QThreadPool(self)
+        self.merge_pool.setMaxThreadCount(1)  # 連結タスク自体が内部でスレッド並列に読み込む
 
     def initUI(self):
         self.setWindowTitle("Image Merger with Preview")
@@ -37,8 +90,38 @@ class ImageMergerApp(QWidget):
         self.direction_group.addButton(btn_vertical, 1)
         hbox_direction.addWidget(btn_vertical)
 
+        # グリッド・詰め込み（コンタクトシート）
+        for layout_id, text in ((LAYOUT_GRID, "グリッド"), (LAYOUT_SHELF, "シェルフ"), (LAYOUT_MASONRY, "メイソンリー")):
+            btn = QRadioButton(text, self)
+            self.direction_group.addButton(btn, layout_id)
+            hbox_direction.addWidget(btn)
+
         layout.addLayout(hbox_direction)
 
+        # グリッド・詰め込みのオプション
+        hbox_sheet = QHBoxLayout()
+        hbox_sheet.addWidget(QLabel("列数:", self))
+        self.columns_spin = QSpinBox(self)
+        self.columns_spin.setRange(0, 1000)
+        self.columns_spin.setSpecialValueText("自動")  # 0 = 縦横比から自動で決める（グリッドのみ）
+        hbox_sheet.addWidget(self.columns_spin)
+        hbox_sheet.addWidget(QLabel("縦横比:", self))
+        self.aspect_combo = QComboBox(self)
+        self.aspect_combo.addItems(ASPECT_RATIOS.keys())
+        hbox_sheet.addWidget(self.aspect_combo)
+        hbox_sheet.addWidget(QLabel("セル幅:", self))
+        self.cell_spin = QSpinBox(self)
+        self.cell_spin.setRange(0, 10000)
+        self.cell_spin.setSpecialValueText("元のサイズ")  # 0 = 縮小しない
+        hbox_sheet.addWidget(self.cell_spin)
+        layout.addLayout(hbox_sheet)
+
+        # 並べ方やオプションを変えたらプレビューを作り直す
+        self.direction_group.buttonClicked.connect(self.refresh_preview)
+        self.aspect_combo.currentIndexChanged.connect(self.refresh_preview)
+        self.columns_spin.editingFinished.connect(self.refresh_preview)
+        self.cell_spin.editingFinished.connect(self.refresh_preview)
+
         # ファイル選択ボタン
         self.btn_select = QPushButton('ファイルを選択', self)
         self.btn_select.clicked.connect(self.open_file_dialog)
@@ -83,61 +166,64 @@ class ImageMergerApp(QWidget):
             QMessageBox.warning(self, "エラー", "複数枚の画像を選択してください。")
 
     def merge_images(self):
-        # 連結方向の取得
-        direction = self.direction_group.checkedId()
+        # 並べ方の取得（0：横方向、1：縦方向、2以降：グリッド・詰め込み）
+        mode = self.direction_group.checkedId()
+
+        # レイアウトの計算とプレビューの組み立てはワーカースレッドで行う
+        self.merge_generation += 1
+        self.layout_info = None
+        self.btn_save.setEnabled(False)
+        self.preview_label.setText("プレビューを作成中...")
+        task = MergePreviewTask(self.merge_generation, list(self.image_paths), mode, self.columns_spin.value(),
+                                ASPECT_RATIOS[self.aspect_combo.currentText()], self.cell_spin.value())
+        task.signals.finished.connect(self.on_preview_ready)
+        self.merge_pool.start(task)
+
+    def refresh_preview(self, *args):
+        if len(self.image_paths) > 1:
+            self.merge_images()
 
-        # 画像を読み込む
-        images = [Image.open(img_path) for img_path in self.image_paths]
-        
-        # 最大の幅と高さを取得
-        max_width = max(img.width for img in images)
-        max_height = max(img.height for img in images)
-
-        # 連結する方向に応じてサイズを計算
-        if direction == 0:  # 横方向に連結
-            total_width = sum(img.width for img in images)
-            self.merged_image = Image.new('RGB', (total_width, max_height), color=(255, 255, 255))
-            x_offset = 0
-            for img in images:
-                padded_img = ImageOps.pad(img, (img.width, max_height), color=(255, 255, 255))
-                self.merged_image.paste(padded_img, (x_offset, 0))
-                x_offset += img.width
-        else:  # 縦方向に連結
-            total_height = sum(img.height for img in images)
-            self.merged_image = Image.new('RGB', (max_width, total_height), color=(255, 255, 255))
-            y_offset = 0
-            for img in images:
-                padded_img = ImageOps.pad(img, (max_width, img.height), color=(255, 255, 255))
-                self.merged_image.paste(padded_img, (0, y_offset))
-                y_offset += img.height
-
-        # 画像をプレビュー表示
-        self.show_preview()
+    def on_preview_ready(self, generation, result, error):
+        if generation != self.merge_generation:
+            return  # 途中で連結し直した
+        if result is None:
+            self.preview_label.setText("プレビュー表示")
+            QMessageBox.warning(self, "エラー", f"画像を連結できませんでした:\n{error}")
+            return
+        self.layout_info, qimage = result
+        self.show_preview(qimage)
         self.btn_save.setEnabled(True)  # 決定ボタンを有効化
 
-    def show_preview(self):
-        # PillowのImageからQtのQImageに変換
-        qimage = self.pil_to_qimage(self.merged_image)
-        pixmap = QPixmap.fromImage(qimage)
-        self.preview_label.setPixmap(pixmap.scaled(400, 300, Qt.KeepAspectRatio))
-
-    def pil_to_qimage(self, pil_image):
-        """PillowのImageをQtのQImageに変換"""
-        pil_image = pil_image.convert('RGB')
-        data = pil_image.tobytes("raw", "RGB")
-        qimage = QImage(data, pil_image.width, pil_image.height, QImage.Format_RGB888)
-        return qimage
+    def show_preview(self, qimage):
+        # サムネイルの連結は表示サイズで作ってあるので、そのまま表示する
+        width, height = self.layout_info[0]
+        self.preview_label.setPixmap(QPixmap.fromImage(qimage))
+        self.preview_label.setToolTip(f"{width} x {height}")
 
     def save_image(self):
-        if self.merged_image:
-            # 保存先のパスを決定（最初の画像のフォルダに保存）
-            save_dir = os.path.dirname(self.image_paths[0])
-            save_filename = os.path.join(save_dir, f"merged_image_{len(self.image_paths)}.jpg")
-            self.merged_image.save(save_filename)
-            QMessageBox.information(self, "保存完了", f"画像を保存しました: {save_filename}")
+        if self.layout_info:
+            # 原寸の連結はここで初めて行う（保存先は最初の画像のフォルダ。ワーカースレッドで実行）
+            self.btn_save.setEnabled(False)
+            self.btn_save.setText("保存中...")
+            task = SaveMergedTask(self.merge_generation, list(self.image_paths), self.layout_info)
+            task.signals.finished.connect(self.on_saved)
+            self.merge_pool.start(task)
         else:
             QMessageBox.warning(self, "エラー", "結合された画像がありません。")
 
+    def on_saved(self, generation, save_filename, error):
+        self.btn_save.setText("決定して画像を保存")
+        self.btn_save.setEnabled(generation == self.merge_generation and self.layout_info is not None)
+        if save_filename is None:
+            QMessageBox.warning(self, "エラー", f"画像を保存できませんでした:\n{error}")
+        else:
+            QMessageBox.information(self, "保存完了", f"画像を保存しました: {save_filename}")
+
+    def closeEvent(self, event):
+        # 実行中の保存が終わるまで待つ（書きかけのファイルを残さない）
+        self.merge_pool.waitForDone()
+        event.accept()
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     ex = ImageMergerApp()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+画像調整パイプラインのベンチマーク
+・変更前の実装（ImageEnhance を毎回3つ生成、HSV往復は lambda 付き point）と
+  調整プラン版（apply_adjustments）の 1メガピクセルあたりの処理時間を比較する
+・スライダーの組み合わせごとに計測する
+
+実行例: python benchmarks/bench_adjustments.py [メガピクセル数]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageEnhance, ImageFilter
+from image_converter_core import DEFAULT_PARAMS, apply_adjustments, compile_adjustments, sepia_tone
+
+COMBINATIONS = {
+    "無調整": {},
+    "明るさ": {"brightness": 120},
+    "明るさ+コントラスト": {"brightness": 120, "contrast": 80},
+    "鮮明度": {"sharpness": 140},
+    "ぼかし": {"blur": 3},
+    "色相": {"hue": 60},
+    "モノクロ": {"monochrome": True},
+    "セピア": {"sepia": True},
+    "モノクロ+セピア": {"monochrome": True, "sepia": True},
+    "すべて": {"brightness": 120, "contrast": 80, "sharpness": 140, "blur": 3,
+               "hue": 60, "monochrome": True, "sepia": True},
+}
+REPEAT = 3
+
+def legacy_adjustments(img, params):
+    """変更前の実装（比較用）"""
+    img = ImageEnhance.Brightness(img).enhance(params["brightness"] / 100.0)
+    img = ImageEnhance.Contrast(img).enhance(params["contrast"] / 100.0)
+    img = ImageEnhance.Sharpness(img).enhance(params["sharpness"] / 100.0)
+    if params["blur"] > 0:
+        img = img.filter(ImageFilter.GaussianBlur(radius=params["blur"]))
+    if params["hue"] != 0:
+        h, s, v = img.convert("HSV").split()
+        shift = int(params["hue"] * 255 / 360)
+        h = h.point(lambda p: (p + shift) % 256)
+        img = Image.merge("HSV", (h, s, v)).convert("RGB")
+    if params["monochrome"]:
+        img = img.convert("L").convert("RGB")
+    if params["sepia"]:
+        img = sepia_tone(img)
+    return img
+
+def best_time(func, img, params):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(img, params)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    size = (width, width * 3 // 4)
+    img = Image.merge("RGB", [Image.effect_noise(size, 64 + 16 * i) for i in range(3)])
+    mp = size[0] * size[1] / 1_000_000
+
+    print(f"入力: {size[0]}x{size[1]} ({mp:.1f} MP)")
+    print(f"{'組み合わせ':<20} {'ステージ':<28} {'従来(ms/MP)':>12} {'プラン(ms/MP)':>14} {'倍率':>6}")
+    for name, overrides in COMBINATIONS.items():
+        params = dict(DEFAULT_PARAMS, **overrides)
+        stages = ",".join(stage_name for stage_name, _ in compile_adjustments(params)) or "-"
+        legacy = best_time(legacy_adjustments, img, params) * 1000 / mp
+        fused = best_time(apply_adjustments, img, params) * 1000 / mp
+        ratio = f"{legacy / fused:>5.1f}x" if fused > 0.01 else "    -"
+        print(f"{name:<20} {stages:<28} {legacy:>12.2f} {fused:>14.2f} {ratio}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+book_maker のページ描画・画像変換のベンチマーク
+・A5ページ（1050x1485）に縦書きの本文を PangoCairo で描いたサーフェスを、
+  変更前の変換（write_to_png → Image.open → convert("RGB")）と surface_to_image（画素バッファから直接）で
+  PIL.Image にするまでの 1ページあたりの時間を比較する
+・ページ全体の描画（render_page）について、レイアウト・フォント指定を列ごとに作り直す場合（変更前の手順）と
+  PageRenderer のキャッシュを使い回す場合の 1ページあたりの時間を比較する
+・計測の前に、キャッシュを使い回した描画（2ページ目以降）が、毎回作り直した描画と画素単位で一致するかを確かめる
+
+実行例: python benchmarks/bench_book_page.py [フォント名] [ページ数]
+"""
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cairo
+from PIL import Image, ImageChops
+from book_maker import (
+    PAGE_HEIGHT, PAGE_WIDTH, PageRenderer, Pango, PangoCairo, draw_deco_pango, render_page, surface_to_image,
+)
+
+SAMPLE_TEXT = "吾輩は猫である。名前はまだ無い。どこで生れたかとんと見当がつかぬ。" * 4
+
+def make_settings(font):
+    return {
+        "columns": 2, "chars_per_col": 40, "font": font, "font_size": 32, "margin_lr": 40, "margin_tb": 30,
+        "text_color": "#000000", "deco_style": "二本線", "color1": "#000000", "color2": "#000000",
+    }
+
+def render_surface(settings, page_number=1):
+    """render_page と同じ内容を、列・ページ番号ごとにレイアウトとフォント指定を作り直して描いたサーフェス（変更前の手順）"""
+    columns, chars_per_col, fs = settings["columns"], settings["chars_per_col"], settings["font_size"]
+    margin_lr, margin_tb = settings["margin_lr"], settings["margin_tb"]
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, PAGE_WIDTH, PAGE_HEIGHT)
+    cr = cairo.Context(surface)
+    cr.set_source_rgb(1, 1, 1)
+    cr.paint()
+    cr.set_source_rgb(0, 0, 0)
+    col_width = (PAGE_WIDTH - 2 * margin_lr) / columns
+    for col_index in range(columns):
+        cr.save()
+        cr.move_to(margin_lr + (columns - col_index) * col_width, margin_tb)
+        cr.rotate(math.pi / 2)
+        layout = PangoCairo.create_layout(cr)
+        layout.set_text(SAMPLE_TEXT[col_index * chars_per_col:(col_index + 1) * chars_per_col], -1)
+        layout.set_font_description(Pango.FontDescription(f"{settings['font']} {fs}"))
+        layout.set_width(int((PAGE_HEIGHT - 2 * margin_tb) * Pango.SCALE))
+        PangoCairo.show_layout(cr, layout)
+        cr.restore()
+    draw_deco_pango(cr, PAGE_WIDTH, PAGE_HEIGHT, margin_lr, margin_tb, settings)
+    num_layout = PangoCairo.create_layout(cr)
+    num_layout.set_text(f"{page_number}", -1)
+    num_layout.set_font_description(Pango.FontDescription(f"{settings['font']} {int(fs * 0.8)}"))
+    _, logical_rect = num_layout.get_pixel_extents()
+    cr.move_to((PAGE_WIDTH - logical_rect.width) / 2, PAGE_HEIGHT - margin_tb - logical_rect.height)
+    cr.set_source_rgb(0.5, 0.5, 0.5)
+    PangoCairo.show_layout(cr, num_layout)
+    return surface
+
+def same_image(a, b):
+    return ImageChops.difference(a, b).getbbox() is None
+
+def legacy_to_image(surface):
+    """変更前の generate_page の変換（比較用）"""
+    buf = io.BytesIO()
+    surface.write_to_png(buf)
+    buf.seek(0)
+    return Image.open(buf).convert("RGB")
+
+def per_page_ms(func, pages):
+    start = time.perf_counter()
+    for _ in range(pages):
+        func()
+    return (time.perf_counter() - start) * 1000 / pages
+
+def main():
+    font = sys.argv[1] if len(sys.argv) > 1 else "MS Gothic"
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    settings = make_settings(font)
+    surface = render_surface(settings)
+    same = same_image(legacy_to_image(surface), surface_to_image(surface))
+    renderer = PageRenderer()
+    # 別のページを1枚描いてキャッシュを温めてから、同じページを描き比べる
+    render_page(SAMPLE_TEXT[::-1], 2, settings, renderer)
+    cached = render_page(SAMPLE_TEXT, 1, settings, renderer)
+    fresh = render_page(SAMPLE_TEXT, 1, settings, PageRenderer())
+    legacy = surface_to_image(render_surface(settings))
+    print(f"A5 {PAGE_WIDTH}x{PAGE_HEIGHT}、{pages} ページの平均（フォント: {font}、変換結果の一致: {same}）")
+    print(f"描画結果の一致: キャッシュ＝毎ページ作成 {same_image(cached, fresh)}、"
+          f"キャッシュ＝従来手順 {same_image(cached, legacy)}")
+    print(f"{'処理':<34} {'ms/ページ':>10}")
+    print(f"{'変換（PNG経由：従来）':<34} {per_page_ms(lambda: legacy_to_image(surface), pages):>10.2f}")
+    print(f"{'変換（画素バッファ直接）':<34} {per_page_ms(lambda: surface_to_image(surface), pages):>10.2f}")
+    print(f"{'描画（レイアウトを毎回作成：従来）':<34} "
+          f"{per_page_ms(lambda: surface_to_image(render_surface(settings)), pages):>10.2f}")
+    print(f"{'描画（PageRenderer を毎ページ作成）':<34} "
+          f"{per_page_ms(lambda: render_page(SAMPLE_TEXT, 1, settings, PageRenderer()), pages):>10.2f}")
+    print(f"{'描画（PageRenderer のキャッシュ）':<34} "
+          f"{per_page_ms(lambda: render_page(SAMPLE_TEXT, 1, settings, renderer), pages):>10.2f}")
+
+if __name__ == '__main__':
+    main()
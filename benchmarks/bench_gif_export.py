@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+GIF書出しのベンチマーク
+・従来の書出し（フレームごとに Pillow の GIF ライター内で減色、1コア）と
+  共通パレット＋並列減色、省メモリ書出し（StreamingGifWriter）の処理時間と出力サイズを比較する
+・出力ファイルを解析し、ローカルカラーテーブルを持つフレームの数も表示する
+  （共通パレットの書出しでは 0 になる）
+
+実行例: python benchmarks/bench_gif_export.py [フレーム数] [幅] [高さ]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+from gif_maker import (
+    EXPORT_IN_FLIGHT_PER_WORKER, StreamingGifWriter, build_global_palette, encode_frame_delta,
+    prepare_frame, sample_indices,
+)
+
+def make_frames(count, size):
+    """グラデーション背景の上を図形が動くテスト用フレーム"""
+    gradient = Image.linear_gradient("L").resize(size)
+    background = Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                                     Image.new("L", size, 96)))
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        draw = ImageDraw.Draw(frame)
+        x = (i * 7) % size[0]
+        draw.ellipse((x, size[1] // 3, x + size[1] // 4, size[1] // 3 + size[1] // 4), fill=(240, 60, 40))
+        draw.rectangle((0, size[1] - 20, x, size[1]), fill=(40, 160, 240))
+        frames.append(frame)
+    return frames
+
+def export_legacy(frames, durations, path):
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=durations, loop=0)
+
+def export_global_palette(frames, durations, path):
+    """GIFCreatorApp.start_parallel_export と同じ手順（差分の減色を並列に行い、未完了を一定数に抑えて順番に書き込む）"""
+    palette = build_global_palette([frames[i] for i in sample_indices(len(frames))])
+    size = frames[0].size
+    workers = os.cpu_count() or 1
+    window = workers * EXPORT_IN_FLIGHT_PER_WORKER
+    pending = deque()
+    prev = None
+    with ProcessPoolExecutor(max_workers=workers) as executor, StreamingGifWriter(path, size, palette=palette) as writer:
+        for frame, duration in zip(frames, durations):
+            if len(pending) >= window:
+                future, pending_duration = pending.popleft()
+                writer.add_encoded(future.result(), pending_duration)
+            frame = prepare_frame(frame, size)
+            pending.append((executor.submit(encode_frame_delta, prev, frame, palette), duration))
+            prev = frame
+        for future, pending_duration in pending:
+            writer.add_encoded(future.result(), pending_duration)
+
+def export_streaming(frames, durations, path, palette=None):
+    with StreamingGifWriter(path, frames[0].size, palette=palette) as writer:
+        for frame, duration in zip(frames, durations):
+            writer.add_frame(frame, duration)
+
+def export_streaming_global(frames, durations, path):
+    palette = build_global_palette([frames[i] for i in sample_indices(len(frames))])
+    export_streaming(frames, durations, path, palette)
+
+def count_local_color_tables(path):
+    """GIF のブロックを順にたどり、(フレーム数, ローカルカラーテーブルを持つフレーム数) を返す"""
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 13
+    if data[10] & 0x80:
+        pos += 3 * 2 ** ((data[10] & 7) + 1)
+    frames = local_tables = 0
+    while data[pos] != 0x3B:
+        if data[pos] == 0x21:  # 拡張ブロック
+            pos += 2
+        else:  # イメージディスクリプタ
+            frames += 1
+            flags = data[pos + 9]
+            pos += 10
+            if flags & 0x80:
+                local_tables += 1
+                pos += 3 * 2 ** ((flags & 7) + 1)
+            pos += 1  # LZW 最小コードサイズ
+        while data[pos]:  # データサブブロック
+            pos += data[pos] + 1
+        pos += 1
+    return frames, local_tables
+
+METHODS = {
+    "従来": export_legacy,
+    "共通パレット+並列": export_global_palette,
+    "省メモリ": export_streaming,
+    "省メモリ+共通パレット": export_streaming_global,
+}
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    size = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (960, 540)
+    frames = make_frames(count, size)
+    durations = [1000 // 30] * count
+    print(f"{count} フレーム {size[0]}x{size[1]}（CPU {os.cpu_count()} コア）")
+    print(f"{'方式':<20} {'時間(s)':>9} {'サイズ(KB)':>11} {'ローカルパレット':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, export in METHODS.items():
+            path = os.path.join(tmp, "out.gif")
+            start = time.perf_counter()
+            export(frames, durations, path)
+            elapsed = time.perf_counter() - start
+            frame_count, local_tables = count_local_color_tables(path)
+            print(f"{name:<20} {elapsed:>9.2f} {os.path.getsize(path) / 1024:>11.0f} "
+                  f"{local_tables:>9}/{frame_count}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+画像連結のピークメモリのベンチマーク
+・従来の連結（全画像を開いて ImageOps.pad でパディングし、キャンバス全体に貼り付け）と
+  ストリップ単位の逐次書き出し（image_merge_core.stream_to_png）の処理時間とピークメモリを比較する
+・スマートフォンのスクリーンショット相当の画像を縦方向に連結し、どちらも PNG に保存する
+  （縦に長いキャンバスは JPEG の上限 65535px を超えるため）
+・ピークメモリを正しく測るため、1回の連結ごとに別プロセスで実行する（Linux 専用）
+
+実行例: python benchmarks/bench_merge_memory.py [枚数] [幅] [高さ]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageOps
+
+def legacy_merge(paths, save_path):
+    """変更前の Image_merger.merge_images の縦方向連結（比較用）"""
+    images = [Image.open(img_path) for img_path in paths]
+    max_width = max(img.width for img in images)
+    total_height = sum(img.height for img in images)
+    merged_image = Image.new('RGB', (max_width, total_height), color=(255, 255, 255))
+    y_offset = 0
+    for img in images:
+        padded_img = ImageOps.pad(img, (max_width, img.height), color=(255, 255, 255))
+        merged_image.paste(padded_img, (0, y_offset))
+        y_offset += img.height
+    merged_image.save(save_path, compress_level=6)
+
+def streaming_merge(paths, save_path):
+    from image_merge_core import linear_layout, read_sizes, stream_to_png
+    stream_to_png(paths, linear_layout(read_sizes(paths), 1), save_path)
+
+def run_child(method, save_path, paths):
+    """子プロセス側：1回連結して、時間(s)とピークメモリ(MB)を出力する"""
+    start = time.perf_counter()
+    (legacy_merge if method == "legacy" else streaming_merge)(paths, save_path)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed} {peak_rss_mb()}")
+
+def peak_rss_mb():
+    """このプロセスの最大常駐メモリ（Linux の VmHWM。ru_maxrss は fork 元の値を引き継ぐため使わない）"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def measure(method, save_path, paths):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", method, save_path] + paths,
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return float(out[-2]), float(out[-1])
+
+def make_screenshot(path, size, index):
+    """文字行の並ぶ画面を模したテスト画像"""
+    img = Image.new("RGB", size, (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, size[0], 120), fill=(40 + index % 200, 120, 200))
+    for y in range(160, size[1] - 40, 48):
+        draw.rectangle((40, y, 40 + (y * 7 + index * 31) % (size[0] - 80), y + 24), fill=(60, 60, 60))
+    img.save(path)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    size = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (1170, 2532)
+    canvas_mb = size[0] * size[1] * count * 3 / 1024 / 1024
+    print(f"入力: {size[0]}x{size[1]} を {count} 枚、縦方向に連結（キャンバス {canvas_mb:.0f} MB）")
+    print(f"{'方式':<10} {'時間(s)':>8} {'ピーク(MB)':>11} {'出力(MB)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(count):
+            paths.append(os.path.join(tmp, f"shot_{i:04d}.png"))
+            make_screenshot(paths[-1], size, i)
+        for name, method in (("従来", "legacy"), ("逐次", "streaming")):
+            save_path = os.path.join(tmp, f"merged_{method}.png")
+            elapsed, peak_mb = measure(method, save_path, paths)
+            print(f"{name:<10} {elapsed:>8.2f} {peak_mb:>11.0f} {os.path.getsize(save_path) / 1024 / 1024:>9.1f}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3], sys.argv[4:])
+    else:
+        main()
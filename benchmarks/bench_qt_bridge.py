@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+PIL → Qt 変換のベンチマーク
+・変更前の各ツールの変換（RGBAまたはRGBへ変換してから tobytes() でコピー）と
+  共通モジュール pil_qt_bridge の 1回あたりの時間と、変換中に確保されるPython側のメモリを比較する
+・QImage 作成まで（プレビューの先読みスレッド相当）と、QPixmap 作成まで（表示相当）を別々に計測する
+・確保メモリは tracemalloc の最大値（tobytes() のバッファ分。Pillow 内部の convert() の確保は含まない）
+・計測の前に、各モード（Qt の形式へそのまま写すもの・変換するもの）と、画素メモリを自分で持たない画像
+  （無圧縮 TIFF・PGM のメモリマップ読み込み、frombuffer）を変換して、元画像と同じ画素になることを確かめる
+
+実行例: QT_QPA_PLATFORM=offscreen python benchmarks/bench_qt_bridge.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+from PIL import Image
+from pil_qt_bridge import QT_FORMATS, pil_to_qimage
+
+SIZES = {
+    "サムネイル": (400, 300),
+    "プレビュー": (1600, 1200),
+    "原寸12MP": (4000, 3000),
+}
+REPEAT = 10
+
+def legacy_qimage(img):
+    """変更前の gif_maker.pil2qimage（どのモードもRGBAに変換してからコピー）"""
+    img = img.convert("RGBA")
+    data = img.tobytes("raw", "RGBA")
+    qimage = QImage(data, img.size[0], img.size[1], QImage.Format_RGBA8888)
+    qimage._buffer = data
+    return qimage
+
+def make_image(mode, size):
+    noise = Image.effect_noise(size, 64)
+    if mode == "L":
+        return noise
+    img = Image.merge("RGB", (noise, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT), Image.new("L", size, 96)))
+    if mode == "RGBA":
+        img.putalpha(noise)
+    return img
+
+def check_pixels():
+    """各モードと外部メモリの画像を変換し、(readonly, 元画像と同じ画素か) を返す"""
+    results = {}
+    base = make_image("RGBA", (64, 48))
+    palette = base.convert("RGB").quantize(64)
+    palette.info["transparency"] = 0
+    for img in (base, base.convert("RGB"), base.convert("L"), base.convert("L").convert("I;16"),
+                base.convert("LA"), palette, base.convert("1"), base.convert("CMYK")):
+        name = img.mode + ("（透過）" if "transparency" in img.info else "")
+        results[name] = (img.readonly, same_pixels(img, pil_to_qimage(img)))
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = {
+            "無圧縮TIFF RGBA": (make_image("RGBA", (64, 48)), "tiff"),
+            "PGM L": (make_image("L", (64, 48)), "pgm"),
+        }
+        for name, (src, ext) in sources.items():
+            path = os.path.join(tmp, f"check.{ext}")
+            src.save(path, **({"compression": None} if ext == "tiff" else {}))
+            with Image.open(path) as img:
+                img.load()
+                results[name] = (img.readonly, same_pixels(img, pil_to_qimage(img)))
+        src = make_image("L", (64, 48))
+        img = Image.frombuffer("L", src.size, src.tobytes(), "raw", "L", 0, 1)
+        results["frombuffer L"] = (img.readonly, same_pixels(img, pil_to_qimage(img)))
+    return results
+
+def same_pixels(img, qimage):
+    """QImage の画素が PIL Image と一致するか（1行ずつ、行末の詰め物を除いて比べる）"""
+    if img.mode not in QT_FORMATS:
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    row_bytes = img.width * QT_FORMATS[img.mode][1]
+    ptr = qimage.constBits()
+    ptr.setsize(qimage.bytesPerLine() * qimage.height())
+    data = bytes(ptr)
+    rows = b"".join(data[y * qimage.bytesPerLine():y * qimage.bytesPerLine() + row_bytes] for y in range(img.height))
+    return rows == img.tobytes()
+
+def measure(convert, img, to_pixmap):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        qimage = convert(img)
+        if to_pixmap:
+            QPixmap.fromImage(qimage)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    qimage = convert(img)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 / 1024
+
+def main():
+    app = QApplication(sys.argv)  # QPixmap の作成に必要
+    for name, (readonly, same) in check_pixels().items():
+        print(f"画素の確認 {name:<16} readonly={readonly} 画素一致={same}")
+    print(f"{'画像':<12} {'モード':<5} {'計測範囲':<8} {'従来(ms)':>9} {'共通(ms)':>9} {'従来(MB)':>9} {'共通(MB)':>9}")
+    for name, size in SIZES.items():
+        for mode in ("RGBA", "RGB", "L"):
+            img = make_image(mode, size)
+            for to_pixmap, label in ((False, "QImage"), (True, "QPixmap")):
+                legacy_ms, legacy_mb = measure(legacy_qimage, img, to_pixmap)
+                bridge_ms, bridge_mb = measure(pil_to_qimage, img, to_pixmap)
+                print(f"{name:<12} {mode:<5} {label:<8} {legacy_ms:>9.2f} {bridge_ms:>9.2f} "
+                      f"{legacy_mb:>9.1f} {bridge_mb:>9.1f}")
+    del app
+
+if __name__ == '__main__':
+    main()
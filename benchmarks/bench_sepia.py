@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+セピアフィルターのベンチマーク
+・従来の画素ループ版と行列変換版（sepia_tone）の処理時間を比較する
+・従来版は全画素だと数分かかるため、先頭の帯（SAMPLE_ROWS行）だけ計測して全体に換算する
+
+実行例: python benchmarks/bench_sepia.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from image_converter_core import sepia_tone
+
+SIZES = {
+    1: (1200, 900),
+    12: (4000, 3000),
+    48: (8000, 6000),
+}
+SAMPLE_ROWS = 32
+
+def legacy_sepia(img):
+    """変更前の画素ループ実装（比較用）"""
+    width, height = img.size
+    pixels = img.load()
+    for py in range(height):
+        for px in range(width):
+            r, g, b = img.getpixel((px, py))
+            tr = int(0.393 * r + 0.769 * g + 0.189 * b)
+            tg = int(0.349 * r + 0.686 * g + 0.168 * b)
+            tb = int(0.272 * r + 0.534 * g + 0.131 * b)
+            pixels[px, py] = (min(255, tr), min(255, tg), min(255, tb))
+    return img
+
+def make_image(size):
+    return Image.merge("RGB", [Image.effect_noise(size, 64 + 16 * i) for i in range(3)])
+
+def main():
+    print(f"{'MP':>4} {'legacy(s, 換算)':>16} {'matrix(s)':>10} {'speedup':>9}")
+    for mp, size in SIZES.items():
+        img = make_image(size)
+
+        strip = img.crop((0, 0, size[0], SAMPLE_ROWS))
+        start = time.perf_counter()
+        legacy_sepia(strip)
+        legacy = (time.perf_counter() - start) * size[1] / SAMPLE_ROWS
+
+        start = time.perf_counter()
+        sepia_tone(img)
+        matrix = time.perf_counter() - start
+
+        print(f"{mp:>4} {legacy:>16.2f} {matrix:>10.3f} {legacy / matrix:>8.0f}x")
+
+if __name__ == '__main__':
+    main()
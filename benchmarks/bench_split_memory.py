@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+画像分割のピークメモリのベンチマーク
+・従来の分割（画像全体をデコードしてから切り出し）と省メモリ分割（split_file_strips：タイル1行分ずつデコード）の
+  処理時間とピークメモリ（最大常駐メモリ）を比較する
+・ピークメモリを正しく測るため、1回の分割ごとに別プロセスで実行する（Linux 専用）
+
+実行例: python benchmarks/bench_split_memory.py [一辺のピクセル数] [分割数]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+FORMATS = {
+    "BMP": ("src.bmp", {}),
+    "TIFF(非圧縮)": ("src.tif", {}),
+    "TIFF(ストリップ)": ("strips.tif", {"tiffinfo": {278: 64}}),  # RowsPerStrip=64
+    # PNG・JPEG は帯に分けられないため、省メモリ分割でも全体をデコードする（従来と同程度になる）
+    "PNG": ("src.png", {"compress_level": 1}),
+    "JPEG": ("src.jpg", {"quality": 90}),
+}
+
+def legacy_split(file_path, h_splits, v_splits):
+    """変更前の実装（比較用）：画像全体をデコードして切り出す"""
+    img = Image.open(file_path)
+    width, height = img.size
+    img_name, img_ext = os.path.splitext(file_path)
+    h_step = width // h_splits
+    v_step = height // v_splits
+    counter = 1
+    for v in range(v_splits):
+        for h in range(h_splits):
+            right = (h + 1) * h_step if h != h_splits - 1 else width
+            lower = (v + 1) * v_step if v != v_splits - 1 else height
+            img.crop((h * h_step, v * v_step, right, lower)).save(f"{img_name}_{counter}{img_ext}")
+            counter += 1
+
+def run_child(method, file_path, splits):
+    """子プロセス側：1回分割して、時間(s)とピークメモリ(MB)を出力する"""
+    from image_splitter import split_file_strips
+    start = time.perf_counter()
+    if method == "legacy":
+        legacy_split(file_path, splits, splits)
+    else:
+        split_file_strips(file_path, splits, splits)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed} {peak_rss_mb()}")
+
+def peak_rss_mb():
+    """このプロセスの最大常駐メモリ（Linux の VmHWM。ru_maxrss は fork 元の値を引き継ぐため使わない）"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def measure(method, file_path, splits):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", method, file_path, str(splits)],
+        check=True, capture_output=True, text=True,
+        env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+    ).stdout.split()
+    return float(out[-2]), float(out[-1])
+
+def main():
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    splits = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"入力: {side}x{side} RGB（{side * side * 3 / 1024 / 1024:.0f} MB）を {splits}x{splits} に分割")
+    print(f"{'形式':<18} {'従来(s)':>8} {'従来(MB)':>9} {'省メモリ(s)':>11} {'省メモリ(MB)':>12}")
+    img = Image.linear_gradient("L").resize((side, side))
+    img = Image.merge("RGB", (img, img.transpose(Image.Transpose.ROTATE_90), Image.new("L", img.size, 128)))
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = {}
+        for name, (file_name, options) in FORMATS.items():
+            sources[name] = os.path.join(tmp, file_name)
+            img.save(sources[name], **options)
+        del img
+        for name, file_path in sources.items():
+            legacy_time, legacy_mb = measure("legacy", file_path, splits)
+            strip_time, strip_mb = measure("strips", file_path, splits)
+            print(f"{name:<18} {legacy_time:>8.2f} {legacy_mb:>9.0f} {strip_time:>11.2f} {strip_mb:>12.0f}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -2,7 +2,10 @@
 import tkinter as tk
 from tkinter import ttk, colorchooser, filedialog, messagebox
 from PIL import Image, ImageTk, ImageOps
-import os, io, cairo
+import os, sys, math, cairo
+import multiprocessing, queue, threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 # PyGObjectによるPangoCairoの利用
 import gi
@@ -14,7 +17,14 @@ from gi.repository import Pango, PangoCairo
 PAGE_WIDTH = 1050
 PAGE_HEIGHT = 1485
 
-MAX_PAGES = 4  # プレビューで表示するページの上限
+PAGE_CACHE_SIZE = 8  # 描画済みページ画像を保持する枚数（1枚約4.5MB）
+TEXT_LAYER_CACHE_SIZE = 8  # 装飾を描く前の本文レイヤーを保持する枚数（1枚約6MB）
+
+# 本文レイヤーの描画に使うパラメータ（これ以外＝装飾・色1・色2の変更では本文を描き直さない）
+TEXT_SETTING_KEYS = ("columns", "chars_per_col", "font", "font_size", "margin_lr", "margin_tb", "text_color")
+
+# Cairo の FORMAT_RGB24 は1画素32bitの xRGB（ネイティブエンディアン）。メモリ上のバイト順に合わせた Pillow の rawmode
+CAIRO_RGB24_RAWMODE = "BGRX" if sys.byteorder == "little" else "XRGB"
 
 # ■ 縦書き用プリセット：段数（＝縦列数）と1段あたりの文字数
 VERTICAL_PRESETS = {
@@ -34,12 +44,383 @@ FONT_MAP = {
     "Calibri":          "C:/Windows/Fonts/calibri.ttf",
 }
 
+# --------------------------------------------------
+# Cairo の画像サーフェス → PIL.Image（RGB）
+# ・サーフェスの画素バッファを BGRX（1画素4バイト、行末に詰め物あり）として読み、RGB へ1回だけ詰め直す
+# ・PNG への圧縮・展開を挟まないので、ページあたりの変換は画素のコピー1回分で済む
+# --------------------------------------------------
+def surface_to_image(surface):
+    surface.flush()  # Cairo 側の描画をバッファへ反映させる
+    size = (surface.get_width(), surface.get_height())
+    return Image.frombuffer("RGB", size, surface.get_data(), "raw", CAIRO_RGB24_RAWMODE, surface.get_stride(), 1)
+
+# --------------------------------------------------
+# ページ分割（文書モデル）
+# ・本文全体のページ区切り（各ページの開始位置）を先に計算し、画像はまだ作らない
+# ・ページ画像は表示・出力するときに render_page で1枚ずつ描画する
+# ・プレビューの描画スレッドにもそのまま渡すため、作成後は変更しない（編集時は reflow で新しく作る）
+# --------------------------------------------------
+class BookDocument:
+    def __init__(self, text, settings, page_starts=None, first_changed_page=0):
+        self.text = text
+        self.settings = settings
+        self.capacity = settings["columns"] * settings["chars_per_col"]  # 1ページの文字数
+        if page_starts is None:
+            page_starts = list(range(0, len(text), self.capacity))
+        self.page_starts = page_starts  # 各ページの開始位置
+        self.first_changed_page = first_changed_page  # 直前の文書から内容が変わった最初のページ
+
+    def reflow(self, text, settings):
+        """
+        編集後の文書を返す。組版のパラメータが同じなら、変更位置を含むページより前の区切りはそのまま使い、
+        そのページ以降だけ区切り直す
+        """
+        if any(settings[key] != self.settings[key] for key in ("columns", "chars_per_col")):
+            return BookDocument(text, settings)
+        prefix = len(os.path.commonprefix([self.text, text]))
+        first = min(prefix // self.capacity, len(self.page_starts))
+        page_starts = self.page_starts[:first] + list(range(first * self.capacity, len(text), self.capacity))
+        return BookDocument(text, settings, page_starts, first)
+
+    def page_count(self):
+        return len(self.page_starts)
+
+    def page_text(self, index):
+        start = self.page_starts[index]
+        return self.text[start:start + self.capacity]
+
+# --------------------------------------------------
+# 描画済みページの LRU キャッシュ
+# ・キーは内容とパラメータから作る（page_key / text_layer_key）。ページ番号ではないので、
+#   編集しても本文・パラメータが変わらないページはそのまま使い回せる
+# --------------------------------------------------
+class PageCache:
+    def __init__(self, capacity=PAGE_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        img = self.entries.get(key)
+        if img is not None:
+            self.entries.move_to_end(key)
+        return img
+
+    def put(self, key, img):
+        self.entries[key] = img
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+def text_layer_key(page_text, settings):
+    return (page_text,) + tuple(settings[key] for key in TEXT_SETTING_KEYS)
+
+def page_key(page_text, page_number, settings):
+    return (page_text, page_number) + tuple(sorted(settings.items()))
+
+# --------------------------------------------------
+# ページ描画用の Pango 環境
+# ・フォントマップと、文字の向きごとの Pango コンテキストを1回だけ作り、全ページで共有する
+# ・縦書きは90度回転した座標系で1行を上から下へ組む（和文は Pango のグラビティ自動判定で正立する）
+# ・フォント指定とレイアウトは (フォント, サイズ, 向き, 幅) ごとにキャッシュし、ページやプレビュー更新をまたいで使い回す
+#   （使うたびに変わるのは本文だけなので、set_text だけで済む）
+# ・プロセス（出力ワーカー）・スレッドごとに1つ作って使う
+# --------------------------------------------------
+ORIENTATION_HORIZONTAL = "horizontal"
+ORIENTATION_VERTICAL = "vertical"
+
+class PageRenderer:
+    LAYOUT_CACHE_SIZE = 32  # パラメータ編集で使われなくなったレイアウトは古い順に捨てる
+
+    def __init__(self):
+        # Pango のオブジェクトはスレッド間で共有できないため、作成したスレッド以外からの使用を禁止する
+        self.owner_thread = threading.get_ident()
+        self.font_map = PangoCairo.FontMap.new()
+        self.contexts = {}  # 向き → Pango.Context
+        self.font_descriptions = {}  # (フォント, サイズ) → Pango.FontDescription
+        self.layouts = OrderedDict()  # (フォント, サイズ, 向き, 幅) → Pango.Layout
+
+    def context(self, cr, orientation):
+        """
+        向きごとの Pango コンテキスト。初回だけ cr の設定（フォントオプション、縦書きは回転）を反映する。
+        ページのサーフェスはすべて同じ設定で作るので、2ページ目以降は作り直さない。
+        """
+        context = self.contexts.get(orientation)
+        if context is None:
+            context = self.font_map.create_context()
+            cr.save()
+            if orientation == ORIENTATION_VERTICAL:
+                cr.rotate(math.pi / 2)
+            PangoCairo.update_context(cr, context)
+            cr.restore()
+            self.contexts[orientation] = context
+        return context
+
+    def font_description(self, font, size):
+        key = (font, size)
+        desc = self.font_descriptions.get(key)
+        if desc is None:
+            # フォント指定（例："MS Gothic 32"）
+            desc = self.font_descriptions[key] = Pango.FontDescription(f"{font} {size}")
+        return desc
+
+    def layout(self, cr, font, size, orientation, width=None):
+        """キャッシュ済みのレイアウト（width は1行の長さの上限px。None なら折り返さない）"""
+        if threading.get_ident() != self.owner_thread:
+            raise RuntimeError("PageRenderer は作成したスレッドからのみ使用できます")
+        key = (font, size, orientation, width)
+        layout = self.layouts.get(key)
+        if layout is not None:
+            self.layouts.move_to_end(key)
+            return layout
+        layout = Pango.Layout.new(self.context(cr, orientation))
+        layout.set_font_description(self.font_description(font, size))
+        if width is not None:
+            layout.set_width(int(width * Pango.SCALE))  # Pango単位に変換
+        self.layouts[key] = layout
+        while len(self.layouts) > self.LAYOUT_CACHE_SIZE:
+            self.layouts.popitem(last=False)
+        return layout
+
+# --------------------------------------------------
+# 1ページ分の画像生成（縦書き：PangoCairo利用）
+# ・settings は ShinshoMakerApp.current_settings() の辞書（Tk に依存しないので別プロセスからも呼べる）
+# ・本文レイヤー（背景＋本文）と、その上に描く装飾・ページ番号を分けて描画できる。
+#   装飾の種類や色だけを変えたときは、キャッシュした本文レイヤーに装飾を描き直すだけで済む
+# --------------------------------------------------
+def render_page(page_text, page_number, settings, renderer):
+    return finish_page(render_text_layer(page_text, settings, renderer), page_number, settings, renderer)
+
+def render_text_layer(page_text, settings, renderer):
+    """背景と本文だけを描いた Cairo サーフェスを返す"""
+    columns = settings["columns"]
+    chars_per_col = settings["chars_per_col"]
+    fs = settings["font_size"]
+    margin_lr = settings["margin_lr"]
+    margin_tb = settings["margin_tb"]
+
+    # 利用可能領域
+    avail_width = PAGE_WIDTH - 2 * margin_lr
+    avail_height = PAGE_HEIGHT - 2 * margin_tb
+    col_width = avail_width / columns
+
+    # Cairoの画像サーフェス作成
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, PAGE_WIDTH, PAGE_HEIGHT)
+    cr = cairo.Context(surface)
+    # 背景を白で塗りつぶす
+    cr.set_source_rgb(1,1,1)
+    cr.paint()
+
+    # 各列を右から左に配置（ページ内のテキストを、各列ごとに分割）
+    cr.set_source_rgb(*hex_to_rgb_normalized(settings["text_color"]))
+    # 縦書き：1行の長さは上下余白の内側まで（超えた分は同じ列の左側へ折り返す）
+    layout = renderer.layout(cr, settings["font"], fs, ORIENTATION_VERTICAL, avail_height)
+    for col_index in range(columns):
+        layout.set_text(page_text[col_index * chars_per_col:(col_index + 1) * chars_per_col], -1)
+        # 列の右上から、90度回転した座標系で描画（行は下へ、次の行は左へ進む）
+        x = margin_lr + (columns - col_index) * col_width
+        cr.save()
+        cr.move_to(x, margin_tb)
+        cr.rotate(math.pi / 2)
+        PangoCairo.show_layout(cr, layout)
+        cr.restore()
+    surface.flush()
+    return surface
+
+def finish_page(text_layer, page_number, settings, renderer):
+    """本文レイヤーの複製に装飾とページ番号を描き、PIL.Image にして返す（本文レイヤーは変更しない）"""
+    fs = settings["font_size"]
+    margin_lr = settings["margin_lr"]
+    margin_tb = settings["margin_tb"]
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, PAGE_WIDTH, PAGE_HEIGHT)
+    cr = cairo.Context(surface)
+    cr.set_source_surface(text_layer, 0, 0)
+    cr.paint()
+
+    # 装飾効果を描画
+    draw_deco_pango(cr, PAGE_WIDTH, PAGE_HEIGHT, margin_lr, margin_tb, settings)
+
+    # ページ番号（下中央）もPangoで描画（横書き）
+    num_layout = renderer.layout(cr, settings["font"], int(fs*0.8), ORIENTATION_HORIZONTAL)
+    num_layout.set_text(f"{page_number}", -1)
+    # 幅・高さを取得
+    ink_rect, logical_rect = num_layout.get_pixel_extents()
+    num_w = logical_rect.width
+    num_h = logical_rect.height
+    num_x = (PAGE_WIDTH - num_w) / 2
+    num_y = PAGE_HEIGHT - margin_tb - num_h
+    cr.move_to(num_x, num_y)
+    cr.set_source_rgb(0.5, 0.5, 0.5)  # 灰色
+    PangoCairo.show_layout(cr, num_layout)
+
+    # Cairo SurfaceをPIL.Imageに変換（PNGを経由せず画素バッファから直接）
+    return surface_to_image(surface)
+
+# --------------------------------------------------
+# 装飾効果の描画（Cairo）
+# --------------------------------------------------
+def draw_deco_pango(cr, img_width, img_height, margin_lr, margin_tb, settings):
+    style = settings["deco_style"]
+    color1 = settings["color1"]
+    color2 = settings["color2"]
+    if style == "二本線":
+        top_y = margin_tb / 2
+        bottom_y = img_height - margin_tb / 2
+        cr.set_line_width(2)
+        # 上部2本線
+        cr.set_source_rgb(*hex_to_rgb_normalized(color1))
+        cr.move_to(margin_lr, top_y)
+        cr.line_to(img_width - margin_lr, top_y)
+        cr.stroke()
+        cr.move_to(margin_lr, top_y+3)
+        cr.line_to(img_width - margin_lr, top_y+3)
+        cr.stroke()
+        # 下部2本線
+        cr.set_source_rgb(*hex_to_rgb_normalized(color2))
+        cr.move_to(margin_lr, bottom_y)
+        cr.line_to(img_width - margin_lr, bottom_y)
+        cr.stroke()
+        cr.move_to(margin_lr, bottom_y-3)
+        cr.line_to(img_width - margin_lr, bottom_y-3)
+        cr.stroke()
+    elif style == "上下線":
+        top_y = margin_tb / 2
+        bottom_y = img_height - margin_tb / 2
+        cr.set_line_width(3)
+        cr.set_source_rgb(*hex_to_rgb_normalized(color1))
+        cr.move_to(margin_lr, top_y)
+        cr.line_to(img_width - margin_lr, top_y)
+        cr.stroke()
+        cr.set_source_rgb(*hex_to_rgb_normalized(color2))
+        cr.move_to(margin_lr, bottom_y)
+        cr.line_to(img_width - margin_lr, bottom_y)
+        cr.stroke()
+    elif style == "グラデ":
+        grad_height = 10
+        # 上部グラデーション：色1 → 白
+        for i in range(grad_height):
+            ratio = i / grad_height
+            r, g, b = interpolate_color(color1, "#FFFFFF", ratio)
+            cr.set_source_rgb(r, g, b)
+            cr.move_to(margin_lr, margin_tb/2 + i)
+            cr.line_to(img_width - margin_lr, margin_tb/2 + i)
+            cr.stroke()
+        # 下部グラデーション：白 → 色2
+        for i in range(grad_height):
+            ratio = i / grad_height
+            r, g, b = interpolate_color("#FFFFFF", color2, ratio)
+            cr.set_source_rgb(r, g, b)
+            cr.move_to(margin_lr, img_height - margin_tb/2 - i)
+            cr.line_to(img_width - margin_lr, img_height - margin_tb/2 - i)
+            cr.stroke()
+
+# --------------------------------------------------
+# 色の変換
+# --------------------------------------------------
+def hex_to_rgb_normalized(hex_color):
+    # 0〜1の範囲に正規化
+    hex_color = hex_color.lstrip("#")
+    r = int(hex_color[0:2], 16) / 255.0
+    g = int(hex_color[2:4], 16) / 255.0
+    b = int(hex_color[4:6], 16) / 255.0
+    return (r, g, b)
+
+def interpolate_color(hex1, hex2, ratio):
+    # 2色の間を補間（ratio: 0〜1）
+    hex1 = hex1.lstrip("#")
+    hex2 = hex2.lstrip("#")
+    r1, g1, b1 = int(hex1[0:2], 16), int(hex1[2:4], 16), int(hex1[4:6], 16)
+    r2, g2, b2 = int(hex2[0:2], 16), int(hex2[2:4], 16), int(hex2[4:6], 16)
+    r = int(r1 + (r2 - r1) * ratio) / 255.0
+    g = int(g1 + (g2 - g1) * ratio) / 255.0
+    b = int(b1 + (b2 - b1) * ratio) / 255.0
+    return (r, g, b)
+
+# --------------------------------------------------
+# プレビュー描画スレッド
+# ・Tkのスレッドは描画の要求を積むだけにし、入力中に描画を待たない
+# ・溜まった要求は最新の1件だけ描画する（古い世代の要求は捨てる）
+# ・結果は results キューに入れ、Tkのスレッドが after() で取り出して表示する
+# ・PageRenderer とキャッシュはこのスレッドだけが使う
+# --------------------------------------------------
+class PreviewWorker:
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.results = queue.Queue()  # (世代番号, ページ番号, PIL.Image（失敗時None）, エラー内容)
+        self.pages = PageCache(PAGE_CACHE_SIZE)  # page_key → 完成したページ画像
+        self.text_layers = PageCache(TEXT_LAYER_CACHE_SIZE)  # text_layer_key → 本文レイヤー
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, generation, document, index):
+        self.requests.put((generation, document, index))
+
+    def stop(self):
+        self.requests.put(None)
+
+    def run(self):
+        renderer = PageRenderer()
+        while True:
+            item = self.requests.get()
+            while item is not None and not self.requests.empty():
+                item = self.requests.get()
+            if item is None:
+                return
+            generation, document, index = item
+            try:
+                img = self.render(document, index, renderer)
+            except Exception as e:
+                self.results.put((generation, index, None, str(e)))
+                continue
+            self.results.put((generation, index, img, ""))
+
+    def render(self, document, index, renderer):
+        page_text = document.page_text(index)
+        settings = document.settings
+        key = page_key(page_text, index + 1, settings)
+        img = self.pages.get(key)
+        if img is not None:
+            return img
+        # 本文・文字のパラメータが同じなら、本文レイヤーを使い回して装飾とページ番号だけ描き直す
+        layer_key = text_layer_key(page_text, settings)
+        layer = self.text_layers.get(layer_key)
+        if layer is None:
+            layer = render_text_layer(page_text, settings, renderer)
+            self.text_layers.put(layer_key, layer)
+        img = finish_page(layer, index + 1, settings, renderer)
+        self.pages.put(key, img)
+        return img
+
+# --------------------------------------------------
+# 並列出力（ワーカープロセス側）
+# ・各ワーカーは起動時に1回だけ PageRenderer を作り、割り当てられたページを1枚ずつ描画・保存する
+# ・保存は一時ファイルに書いてから置き換えるので、中止しても書きかけのページ画像は残らない
+# --------------------------------------------------
+_worker_renderer = None
+
+def init_export_worker():
+    global _worker_renderer
+    _worker_renderer = PageRenderer()
+
+def export_page(index, page_text, settings, save_dir, fmt):
+    """1ページ（index は0始まり）を描画して保存する。進捗をページ単位で返せるよう、1ページずつ投入する"""
+    img = render_page(page_text, index + 1, settings, _worker_renderer)
+    file_path = os.path.join(save_dir, f"output_page_{index+1}.{fmt.lower()}")
+    img.save(file_path + ".part", fmt)
+    os.replace(file_path + ".part", file_path)
+
 class ShinshoMakerApp:
     def __init__(self, root):
         self.root = root
         self.root.title("親書メーカー（縦書き）")
         self.preview_update_job = None
-        self.generated_images = []  # PIL.Image形式のページ画像リスト
+        self.document = None  # ページ分割済みの文書（BookDocument）
+        self.preview_worker = PreviewWorker()  # プレビュー描画スレッド
+        self.preview_generation = 0  # 描画を要求するたびに増やし、古い結果を捨てる
+        self.executor = None  # 出力中のプロセスプール
+        self.pending_futures = {}  # Future → ページ番号（1始まり、表示用）
         self.current_page = 0
 
         # デフォルト設定
@@ -59,6 +440,7 @@ class ShinshoMakerApp:
         self.setup_parameters()
         self.setup_right_side()
         self.setup_variable_traces()
+        self.root.after(30, self.poll_preview)
 
     # --------------------------------------------------
     # 左側：パラメータ設定（縦書き専用）
@@ -138,9 +520,17 @@ class ShinshoMakerApp:
         self.text_color_label = tk.Label(font_frame, text=self.text_color, bg=self.text_color, width=8)
         self.text_color_label.pack(side="left", padx=5)
 
-        # 出力ボタン
-        self.export_button = tk.Button(self.param_frame, text="出力", command=self.output_images)
-        self.export_button.pack(pady=10)
+        # 出力ボタン・進捗表示
+        export_frame = tk.Frame(self.param_frame)
+        export_frame.pack(fill="x", pady=10)
+        self.export_button = tk.Button(export_frame, text="出力", command=self.output_images)
+        self.export_button.pack(side="left")
+        self.cancel_button = tk.Button(export_frame, text="中止", command=self.cancel_export, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+        self.export_progress = ttk.Progressbar(self.param_frame, mode="determinate")
+        self.export_progress.pack(fill="x")
+        self.export_status = tk.Label(self.param_frame, text="")
+        self.export_status.pack(anchor="w")
 
     # --------------------------------------------------
     # 右側：文章入力＆プレビュー
@@ -220,14 +610,9 @@ class ShinshoMakerApp:
             self.schedule_preview_update()
 
     # --------------------------------------------------
-    # プレビュー更新（縦書き専用）
+    # 現在のパラメータ（ページ描画用の辞書）
     # --------------------------------------------------
-    def update_preview(self):
-        text = self.text_input.get("1.0", tk.END).strip()
-        if not text:
-            return
-        # 改行除去して連続文字列に
-        clean_text = "".join(text.splitlines())
+    def current_settings(self):
         # 縦組プリセットから、段数と1段あたりの文字数を取得
         preset = VERTICAL_PRESETS.get(self.preset_var.get(), list(VERTICAL_PRESETS.values())[0])
         try:
@@ -238,231 +623,195 @@ class ShinshoMakerApp:
             chars_per_col = int(self.vert_chars.get())
         except:
             chars_per_col = preset["chars_per_col"]
-
-        capacity = columns * chars_per_col
-
-        # ページごとに分割（最大4ページまで）
-        pages = [clean_text[i:i+capacity] for i in range(0, len(clean_text), capacity)]
-        pages = pages[:MAX_PAGES]
-
-        self.generated_images = []
-        for page_text in pages:
-            img = self.generate_page(page_text, columns, chars_per_col)
-            if img:
-                self.generated_images.append(img)
-        if self.generated_images:
-            self.current_page = 0
-            self.show_current_page()
-            self.update_nav_buttons()
-
-    # --------------------------------------------------
-    # 1ページ分の画像生成（縦書き：PangoCairo利用）
-    # --------------------------------------------------
-    def generate_page(self, page_text, columns, chars_per_col):
-        try:
-            # 各パラメータの取得
-            fs = int(self.font_size.get()) if self.font_size.get().isdigit() else 32
-            ls_factor = int(self.line_spacing.get()) if self.line_spacing.get().isdigit() else 100
-            margin_lr = int(self.margin_lr.get()) if self.margin_lr.get().isdigit() else 40
-            margin_tb = int(self.margin_tb.get()) if self.margin_tb.get().isdigit() else 30
-
-            # 利用可能領域
-            avail_width = PAGE_WIDTH - 2 * margin_lr
-            avail_height = PAGE_HEIGHT - 2 * margin_tb
-            col_width = avail_width / columns
-
-            # ページ内のテキストを、各列ごとに分割
-            cols_text = []
-            for i in range(columns):
-                start = i * chars_per_col
-                end = start + chars_per_col
-                cols_text.append(page_text[start:end])
-
-            # Cairoの画像サーフェス作成
-            surface = cairo.ImageSurface(cairo.FORMAT_RGB24, PAGE_WIDTH, PAGE_HEIGHT)
-            cr = cairo.Context(surface)
-            # 背景を白で塗りつぶす
-            cr.set_source_rgb(1,1,1)
-            cr.paint()
-
-            # 各列を右から左に配置
-            for col_index, col_text in enumerate(cols_text):
-                # X座標：右端から開始
-                x = margin_lr + (columns - 1 - col_index) * col_width
-                y = margin_tb
-
-                # PangoCairo レイアウトの作成
-                layout = PangoCairo.create_layout(cr)
-                layout.set_text(col_text, -1)
-                # フォント指定（例："MS Gothic 32"）
-                font_desc = Pango.FontDescription(f"{self.font_choice.get()} {fs}")
-                layout.set_font_description(font_desc)
-                # 縦書き用のオリエンテーション設定
-                layout.set_orientation(Pango.Orientation.VERTICAL)
-                # 列の幅を設定（Pango単位に変換）
-                layout.set_width(int(col_width * Pango.SCALE))
-                # レイアウトを描画
-                cr.move_to(x, y)
-                PangoCairo.show_layout(cr, layout)
-
-            # 装飾効果を描画
-            self.draw_deco_pango(cr, PAGE_WIDTH, PAGE_HEIGHT, margin_lr, margin_tb)
-
-            # ページ番号（下中央）もPangoで描画
-            page_num = f"{self.current_page+1}"
-            num_layout = PangoCairo.create_layout(cr)
-            num_layout.set_text(page_num, -1)
-            num_font_desc = Pango.FontDescription(f"{self.font_choice.get()} {int(fs*0.8)}")
-            num_layout.set_font_description(num_font_desc)
-            # ページ番号は横書き（通常）
-            # 幅・高さを取得
-            ink_rect, logical_rect = num_layout.get_pixel_extents()
-            num_w = logical_rect.width
-            num_h = logical_rect.height
-            num_x = (PAGE_WIDTH - num_w) / 2
-            num_y = PAGE_HEIGHT - margin_tb - num_h
-            cr.move_to(num_x, num_y)
-            cr.set_source_rgb(0.5, 0.5, 0.5)  # 灰色
-            PangoCairo.show_layout(cr, num_layout)
-
-            # Cairo SurfaceをPNGデータにしてPIL.Imageに変換
-            buf = io.BytesIO()
-            surface.write_to_png(buf)
-            buf.seek(0)
-            from PIL import Image
-            pil_img = Image.open(buf)
-            # PIL.ImageをRGBに変換（余計なalpha情報除去）
-            pil_img = pil_img.convert("RGB")
-            return pil_img
-
-        except Exception as e:
-            messagebox.showerror("エラー", str(e))
-            return None
+        if columns <= 0:
+            columns = preset["columns"]
+        if chars_per_col <= 0:
+            chars_per_col = preset["chars_per_col"]
+        return {
+            "columns": columns,
+            "chars_per_col": chars_per_col,
+            "font": self.font_choice.get(),
+            "font_size": int(self.font_size.get()) if self.font_size.get().isdigit() else 32,
+            "margin_lr": int(self.margin_lr.get()) if self.margin_lr.get().isdigit() else 40,
+            "margin_tb": int(self.margin_tb.get()) if self.margin_tb.get().isdigit() else 30,
+            "text_color": self.text_color,
+            "deco_style": self.deco_style.get(),
+            "color1": self.color1,
+            "color2": self.color2,
+        }
 
     # --------------------------------------------------
-    # 装飾効果の描画（Cairo）
+    # プレビュー更新（縦書き専用）
+    # ・本文全体をページ分割するだけで、画像は表示中のページのみ描画スレッドで描画する
+    # ・本文の編集では、変更位置を含むページより前の区切りはそのまま使う
+    # ・描画スレッドは内容＋パラメータをキーにキャッシュしているので、変わっていないページは描き直さない
     # --------------------------------------------------
-    def draw_deco_pango(self, cr, img_width, img_height, margin_lr, margin_tb):
-        style = self.deco_style.get()
-        if style == "二本線":
-            top_y = margin_tb / 2
-            bottom_y = img_height - margin_tb / 2
-            cr.set_line_width(2)
-            # 上部2本線
-            cr.set_source_rgb(*self.hex_to_rgb_normalized(self.color1))
-            cr.move_to(margin_lr, top_y)
-            cr.line_to(img_width - margin_lr, top_y)
-            cr.stroke()
-            cr.move_to(margin_lr, top_y+3)
-            cr.line_to(img_width - margin_lr, top_y+3)
-            cr.stroke()
-            # 下部2本線
-            cr.set_source_rgb(*self.hex_to_rgb_normalized(self.color2))
-            cr.move_to(margin_lr, bottom_y)
-            cr.line_to(img_width - margin_lr, bottom_y)
-            cr.stroke()
-            cr.move_to(margin_lr, bottom_y-3)
-            cr.line_to(img_width - margin_lr, bottom_y-3)
-            cr.stroke()
-        elif style == "上下線":
-            top_y = margin_tb / 2
-            bottom_y = img_height - margin_tb / 2
-            cr.set_line_width(3)
-            cr.set_source_rgb(*self.hex_to_rgb_normalized(self.color1))
-            cr.move_to(margin_lr, top_y)
-            cr.line_to(img_width - margin_lr, top_y)
-            cr.stroke()
-            cr.set_source_rgb(*self.hex_to_rgb_normalized(self.color2))
-            cr.move_to(margin_lr, bottom_y)
-            cr.line_to(img_width - margin_lr, bottom_y)
-            cr.stroke()
-        elif style == "グラデ":
-            grad_height = 10
-            # 上部グラデーション：色1 → 白
-            for i in range(grad_height):
-                ratio = i / grad_height
-                r, g, b = self.interpolate_color(self.color1, "#FFFFFF", ratio)
-                cr.set_source_rgb(r, g, b)
-                cr.move_to(margin_lr, margin_tb/2 + i)
-                cr.line_to(img_width - margin_lr, margin_tb/2 + i)
-                cr.stroke()
-            # 下部グラデーション：白 → 色2
-            for i in range(grad_height):
-                ratio = i / grad_height
-                r, g, b = self.interpolate_color("#FFFFFF", self.color2, ratio)
-                cr.set_source_rgb(r, g, b)
-                cr.move_to(margin_lr, img_height - margin_tb/2 - i)
-                cr.line_to(img_width - margin_lr, img_height - margin_tb/2 - i)
-                cr.stroke()
-
-    def hex_to_rgb_normalized(self, hex_color):
-        # 0〜1の範囲に正規化
-        hex_color = hex_color.lstrip("#")
-        r = int(hex_color[0:2], 16) / 255.0
-        g = int(hex_color[2:4], 16) / 255.0
-        b = int(hex_color[4:6], 16) / 255.0
-        return (r, g, b)
-
-    def interpolate_color(self, hex1, hex2, ratio):
-        # 2色の間を補間（ratio: 0〜1）
-        hex1 = hex1.lstrip("#")
-        hex2 = hex2.lstrip("#")
-        r1, g1, b1 = int(hex1[0:2], 16), int(hex1[2:4], 16), int(hex1[4:6], 16)
-        r2, g2, b2 = int(hex2[0:2], 16), int(hex2[2:4], 16), int(hex2[4:6], 16)
-        r = int(r1 + (r2 - r1) * ratio) / 255.0
-        g = int(g1 + (g2 - g1) * ratio) / 255.0
-        b = int(b1 + (b2 - b1) * ratio) / 255.0
-        return (r, g, b)
+    def update_preview(self):
+        self.preview_update_job = None
+        text = self.text_input.get("1.0", tk.END).strip()
+        if not text:
+            self.clear_preview()
+            return
+        # 改行除去して連続文字列に
+        clean_text = "".join(text.splitlines())
+        settings = self.current_settings()
+        previous = self.document
+        if previous is None:
+            self.document = BookDocument(clean_text, settings)
+        elif clean_text == previous.text and settings == previous.settings:
+            return  # 変更なし
+        else:
+            self.document = previous.reflow(clean_text, settings)
+        # 編集中も表示中のページ位置を保つ
+        self.current_page = min(self.current_page, self.document.page_count() - 1)
+        if (previous is not None and settings == previous.settings
+                and self.current_page < self.document.first_changed_page):
+            # 表示中のページより後ろだけが変わった：描き直さずページ数の表示だけ更新する
+            self.page_label.configure(text=f"Page {self.current_page+1}/{self.document.page_count()}")
+            self.update_nav_buttons()
+            return
+        self.show_current_page()
 
     # --------------------------------------------------
     # ページ切替・プレビュー表示
     # --------------------------------------------------
     def show_current_page(self):
+        # 描画は描画スレッドに任せ、ページ番号とボタンだけ先に更新する
+        self.preview_generation += 1
+        self.preview_worker.request(self.preview_generation, self.document, self.current_page)
+        self.page_label.configure(text=f"Page {self.current_page+1}/{self.document.page_count()}")
+        self.update_nav_buttons()
+
+    def clear_preview(self):
+        # 本文が空になったら前の文書を捨て、描画中の結果も表示しない
+        self.document = None
+        self.current_page = 0
+        self.preview_generation += 1
+        for widget in self.preview_frame.winfo_children():
+            widget.destroy()
+        self.page_label.configure(text="Page 0/0")
+        self.update_nav_buttons()
+
+    def poll_preview(self):
+        try:
+            while True:
+                generation, index, img, error = self.preview_worker.results.get_nowait()
+                if generation != self.preview_generation:
+                    continue  # 途中で別のページ・内容の描画を要求した
+                if img is None:
+                    messagebox.showerror("エラー", error)
+                else:
+                    self.display_page(img)
+        except queue.Empty:
+            pass
+        self.root.after(30, self.poll_preview)
+
+    def display_page(self, img):
         for widget in self.preview_frame.winfo_children():
             widget.destroy()
-        img = self.generated_images[self.current_page]
         img_tk = ImageTk.PhotoImage(img)
         lbl = tk.Label(self.preview_frame, image=img_tk, bd=2, relief="groove")
         lbl.image = img_tk
         lbl.pack()
-        self.page_label.configure(text=f"Page {self.current_page+1}/{len(self.generated_images)}")
 
     def show_prev_page(self):
         if self.current_page > 0:
             self.current_page -= 1
             self.show_current_page()
-            self.update_nav_buttons()
 
     def show_next_page(self):
-        if self.current_page < len(self.generated_images) - 1:
+        if self.document is not None and self.current_page < self.document.page_count() - 1:
             self.current_page += 1
             self.show_current_page()
-            self.update_nav_buttons()
 
     def update_nav_buttons(self):
+        page_count = self.document.page_count() if self.document is not None else 0
         self.prev_button.configure(state="normal" if self.current_page > 0 else "disabled")
-        self.next_button.configure(state="normal" if self.current_page < len(self.generated_images)-1 else "disabled")
+        self.next_button.configure(state="normal" if self.current_page < page_count-1 else "disabled")
 
     # --------------------------------------------------
     # 画像出力
     # --------------------------------------------------
     def output_images(self):
-        if not self.generated_images:
+        # 入力直後でプレビューの更新待ちの変更も含め、現在の本文・パラメータで出力する
+        if self.preview_update_job is not None:
+            self.root.after_cancel(self.preview_update_job)
+        self.update_preview()
+        if self.document is None:
             messagebox.showwarning("注意", "プレビュー画像がありません。")
             return
         save_dir = filedialog.askdirectory(title="画像の保存先を選択")
         if not save_dir:
             return
         fmt = "PNG"
-        for idx, img in enumerate(self.generated_images):
-            file_path = os.path.join(save_dir, f"output_page_{idx+1}.{fmt.lower()}")
-            img.save(file_path, fmt)
-        messagebox.showinfo("完了", f"{len(self.generated_images)} 枚の画像を保存しました。")
+        # 1ページずつプロセスプールへ投入する（Tkのスレッドでは描画しない）
+        document = self.document
+        self.executor = ProcessPoolExecutor(initializer=init_export_worker)
+        self.pending_futures = {}
+        for idx in range(document.page_count()):
+            future = self.executor.submit(export_page, idx, document.page_text(idx), document.settings, save_dir, fmt)
+            self.pending_futures[future] = idx + 1
+        self.export_errors = []
+        self.export_done = 0
+        self.export_total = document.page_count()
+        self.export_progress.configure(maximum=self.export_total, value=0)
+        self.export_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.export_status.configure(text=f"出力中... 0/{self.export_total}", fg="black")
+        self.export_poll_job = self.root.after(50, self.poll_export)
+
+    def poll_export(self):
+        finished = [future for future in self.pending_futures if future.done()]
+        for future in finished:
+            page_number = self.pending_futures.pop(future)
+            try:
+                future.result()
+                self.export_done += 1
+            except Exception as e:
+                self.export_errors.append(f"{page_number}ページ: {e}")
+        if finished:
+            self.export_progress.configure(value=self.export_done)
+            self.export_status.configure(text=f"出力中... {self.export_done}/{self.export_total}")
+        if self.pending_futures:
+            self.export_poll_job = self.root.after(50, self.poll_export)
+            return
+        self.finish_export()
+        self.export_status.configure(text=f"出力完了: {self.export_done}/{self.export_total} ページ")
+        if self.export_errors:
+            messagebox.showwarning("エラー", "以下のページの出力に失敗しました:\n" + "\n".join(self.export_errors))
+        else:
+            messagebox.showinfo("完了", f"{self.export_done} 枚の画像を保存しました。")
+
+    def cancel_export(self):
+        if self.executor is None:
+            return
+        self.root.after_cancel(self.export_poll_job)
+        self.finish_export()
+        self.export_status.configure(text=f"出力を中止しました（{self.export_done}/{self.export_total} 完了）", fg="red")
+
+    def finish_export(self, wait=False):
+        # 未着手のページは破棄する。実行中のページは一時ファイル経由で保存するため、
+        # 終了を待たずに切り離しても壊れたページ画像は残らない
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        self.executor = None
+        self.pending_futures = {}
+        self.export_button.configure(state="normal")
+        self.cancel_button.configure(state="disabled")
+
+    def on_close(self):
+        # 出力中に閉じた場合は、実行中のページが終わるまで待ってから終了する
+        if self.executor is not None:
+            self.root.after_cancel(self.export_poll_job)
+            self.finish_export(wait=True)
+        self.preview_worker.stop()
+        self.root.destroy()
 
 # --------------------------------------------------
 # メイン処理
 # --------------------------------------------------
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # exe化した場合のプロセスプール対応
     root = tk.Tk()
     app = ShinshoMakerApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
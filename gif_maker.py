@@ -1,13 +1,20 @@
 import sys
 import os
+import re
+import struct
 import traceback
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
-    QLabel, QPushButton, QFileDialog, QLineEdit, QSpinBox, QMessageBox
+    QLabel, QPushButton, QFileDialog, QLineEdit, QSpinBox, QMessageBox, QCheckBox
 )
-from PyQt5.QtCore import Qt, QSize, QTimer, QMimeData, QPoint
-from PyQt5.QtGui import QPixmap, QDragEnterEvent, QDropEvent, QPainter, QPen, QImage
-from PIL import Image
+from PyQt5.QtCore import Qt, QSize, QTimer, QMimeData, QPoint, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QPixmap, QDragEnterEvent, QDropEvent, QPainter, QPen
+from PIL import Image, ImageChops, ImageSequence, GifImagePlugin
+from pil_qt_bridge import pil_to_qimage
 
 # Pillow のバージョンに応じたリサイズフィルタを設定
 try:
@@ -15,27 +22,399 @@ try:
 except AttributeError:
     resample_filter = Image.LANCZOS
 
+# デコード済みフレームキャッシュのメモリ上限（バイト）
+FRAME_CACHE_BUDGET = 512 * 1024 * 1024
+
+# 共通パレット書出しで、ワーカー1つあたりに先行して投入しておくフレーム数
+EXPORT_IN_FLIGHT_PER_WORKER = 2
+
 # -------------------------------------------------------
-# PIL Image を QPixmap に変換するヘルパー関数
-# ※RGBA形式に変換し、QImage経由でQPixmapを作成する
+# デコード済みフレームのキャッシュ
+# ・キーは (パス, 更新日時, フレーム番号, サイズ, 縮小表示か)。サムネイル・プレビュー・書出しで共有する
+# ・リサイズ版は元サイズのデコード結果から作るため、1フレームのデコードは1回で済む
+# ・アニメーション画像は直前に開いたファイルを開いたままにし、先頭から順に読む場合は続きからデコードする
+# ・保持している画素データの合計が上限を超えたら、最も古く使われたものから破棄する
 # -------------------------------------------------------
-def pil2pixmap(im):
-    im = im.convert("RGBA")
-    data = im.tobytes("raw", "RGBA")
-    qimage = QImage(data, im.size[0], im.size[1], QImage.Format_RGBA8888)
-    pixmap = QPixmap.fromImage(qimage)
-    return pixmap
+class FrameCache:
+    def __init__(self, budget_bytes=FRAME_CACHE_BUDGET):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.entries = OrderedDict()
+        self.sizes = {}  # (パス, 更新日時) → 元画像サイズ（ヘッダのみ読み込み）
+        self.sequence = None  # 開いたままのアニメーション画像 (パス, 更新日時, Image)
+        self.lock = threading.RLock()  # プレビューの先読みスレッドからも使うため
+
+    def image_size(self, path):
+        key = (path, os.path.getmtime(path))
+        with self.lock:
+            if key not in self.sizes:
+                with Image.open(path) as img:
+                    self.sizes[key] = img.size
+            return self.sizes[key]
+
+    def get(self, path, size=None, fit=False, frame_index=0):
+        """
+        フレーム画像（RGB または RGBA）を返す。
+        ・size 指定時は size にリサイズ（fit=True ならアスペクト比を保って size 内に収める）
+        ・frame_index はアニメーション画像（GIF/APNG/WebP）のフレーム番号。静止画は0
+        ・返した画像は共有されるため、呼び出し側で変更しないこと
+        """
+        with self.lock:
+            mtime = os.path.getmtime(path)
+            if size is not None and not fit and size == self.image_size(path):
+                size = None  # 元サイズと同じならリサイズ版を別に持たない
+            key = (path, mtime, frame_index, size, fit)
+            img = self.entries.get(key)
+            if img is not None:
+                self.entries.move_to_end(key)
+                return img
+            if size is None:
+                if frame_index == 0:
+                    with Image.open(path) as src:
+                        img = self._convert_frame(src)
+                else:
+                    img = self._decode_sequence_frame(path, mtime, frame_index)
+                self.sizes[(path, mtime)] = img.size
+            elif fit:
+                img = self.get(path, frame_index=frame_index).copy()
+                img.thumbnail(size, resample_filter)
+            else:
+                img = self.get(path, frame_index=frame_index).resize(size, resample_filter)
+            self._store(key, img)
+            return img
+
+    @staticmethod
+    def _convert_frame(src):
+        has_alpha = "A" in src.getbands() or "transparency" in src.info
+        return src.convert("RGBA" if has_alpha else "RGB")
+
+    def _decode_sequence_frame(self, path, mtime, frame_index):
+        # GIF は前のフレームに重ねて描画するため、seek は直前の位置より先なら続きから、
+        # 戻る場合は先頭から読み直しになる。取込み・書出しは先頭から順に読むので、開いたままにしておく
+        if self.sequence is None or self.sequence[:2] != (path, mtime):
+            self.close_sequence()
+            self.sequence = (path, mtime, Image.open(path))
+        src = self.sequence[2]
+        src.seek(frame_index)
+        return self._convert_frame(src)
+
+    def close_sequence(self):
+        with self.lock:
+            if self.sequence is not None:
+                self.sequence[2].close()
+                self.sequence = None
+
+    def _store(self, key, img):
+        nbytes = img.width * img.height * len(img.getbands())
+        if nbytes > self.budget_bytes:
+            return  # 上限を超える巨大な画像はキャッシュしない
+        while self.entries and self.used_bytes + nbytes > self.budget_bytes:
+            _, old = self.entries.popitem(last=False)
+            self.used_bytes -= old.width * old.height * len(old.getbands())
+        self.entries[key] = img
+        self.used_bytes += nbytes
+
+# -------------------------------------------------------
+# 複数フレームの入力（アニメーション画像・連番画像フォルダ）の取込み
+# ・指定fpsの時刻ごとに、その時刻に表示されているフレームを1枚選ぶ（間引き・水増し）
+# ・ここでは (フレームの参照, 表示時間ms) を順に返すだけで、画素のデコードはフレームキャッシュが必要時に行う
+# -------------------------------------------------------
+ANIMATED_EXTENSIONS = ('.gif', '.png', '.apng', '.webp')
+STILL_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+NUMBERED_FRAME_PATTERN = re.compile(r'^(.*?)(\d+)\.(png|jpe?g)$', re.IGNORECASE)
+
+def count_frames(path):
+    """アニメーション画像のフレーム数（静止画は1）"""
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+def resample_timeline(durations, fps):
+    """
+    各フレームの表示時間（ms）の並びから、fps ごとの時刻に表示されているフレームを選ぶ。
+    同じフレームが続く場合はまとめて (フレーム番号, 表示時間ms) を返す。
+    """
+    interval = 1000.0 / fps
+    start = 0.0
+    slot = 0  # 次に割り当てる時刻の番号
+    for index, duration in enumerate(durations):
+        end = start + duration
+        picked = 0
+        while slot * interval < end:
+            picked += 1
+            slot += 1
+        if picked:
+            yield index, int(round(picked * interval))
+        start = end
+
+def sample_animation(path, fps):
+    """アニメーション画像から fps で間引いた (フレーム番号, 表示時間ms) を返す"""
+    with Image.open(path) as img:
+        durations = [frame.info.get("duration") or 100 for frame in ImageSequence.Iterator(img)]
+    return list(resample_timeline(durations, fps))
+
+def expand_input(path, fps, source_fps):
+    """
+    入力1件を (パス, フレーム番号, 表示時間ms) の並びに展開する（静止画は1秒＝60フレーム相当）。
+    アニメーション画像は表示時間を読むために全フレームをたどるので、ワーカースレッドから呼ぶ。
+    """
+    if os.path.isdir(path):
+        return [(frame_path, 0, duration_ms) for frame_path, duration_ms
+                in sample_numbered_frames(path, source_fps, fps)]
+    lower = path.lower()
+    if not lower.endswith(STILL_EXTENSIONS + ANIMATED_EXTENSIONS):
+        return []
+    if lower.endswith(ANIMATED_EXTENSIONS) and count_frames(path) > 1:
+        return [(path, frame_index, duration_ms) for frame_index, duration_ms
+                in sample_animation(path, fps)]
+    return [(path, 0, 1000)]
+
+def sample_numbered_frames(directory, source_fps, fps):
+    """
+    連番画像のフォルダ（例: frame_0001.png, frame_0002.png ...）を source_fps の動画とみなし、
+    fps で間引いた (パス, 表示時間ms) を返す。最も枚数の多い連番を対象とする。
+    """
+    groups = {}
+    for name in os.listdir(directory):
+        m = NUMBERED_FRAME_PATTERN.match(name)
+        if m:
+            groups.setdefault(m.group(1).lower(), []).append((int(m.group(2)), name))
+    if not groups:
+        return []
+    names = [name for _, name in sorted(max(groups.values(), key=len))]
+    durations = [1000.0 / source_fps] * len(names)
+    return [(os.path.join(directory, names[index]), duration_ms)
+            for index, duration_ms in resample_timeline(durations, fps)]
+
+# -------------------------------------------------------
+# 共通パレット
+# ・フレーム列から均等に抜き出したサンプルを縮小して1枚にまとめ、255色に減色してパレットとする
+# ・255色に抑えるのは、差分書出しで最後の1色（インデックス255）を透過用に使うため
+# -------------------------------------------------------
+GLOBAL_PALETTE_SAMPLES = 16
+
+def sample_indices(count, samples=GLOBAL_PALETTE_SAMPLES):
+    step = max(1, count / samples)
+    return sorted({int(i * step) for i in range(min(count, samples))})
+
+def build_global_palette(samples, thumb_size=(160, 160)):
+    """サンプル画像のリストから共通パレット（255色のPモード画像）を作る"""
+    thumbs = []
+    for img in samples:
+        thumb = img.convert("RGB")
+        thumb.thumbnail(thumb_size, resample_filter)
+        thumbs.append(thumb)
+    montage = Image.new("RGB", (thumb_size[0], thumb_size[1] * len(thumbs)))
+    for i, thumb in enumerate(thumbs):
+        montage.paste(thumb, (0, i * thumb_size[1]))
+    quantized = montage.quantize(colors=255, method=Image.Quantize.MEDIANCUT)
+    palette_img = Image.new("P", (1, 1))
+    palette_img.putpalette(quantized.getpalette()[:255 * 3])
+    return palette_img
+
+def quantize_frame(img, palette_img):
+    """共通パレットへ誤差拡散で減色する"""
+    return img.convert("RGB").quantize(palette=palette_img, dither=Image.Dither.FLOYDSTEINBERG)
+
+# GIF の透過色に使うパレットインデックス（減色は255色までにし、最後の1色を空けておく）
+TRANSPARENT_INDEX = 255
+
+def prepare_frame(img, size):
+    """書出しサイズ・RGB にそろえる"""
+    if img.size != size:
+        img = img.resize(size, resample_filter)
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+def encode_frame_delta(prev_img, img, palette=None):
+    """
+    直前フレームからの差分を減色したフレームにする（プロセスプールのワーカーからも呼ばれる）
+    ・戻り値は (パレット画像, 位置, 透過あり)。直前と同一なら None
+    ・prev_img, img は prepare_frame 済みのもの。prev_img が None なら全体を書き出す
+    """
+    if prev_img is None:
+        bbox = (0, 0) + img.size
+    else:
+        diff = ImageChops.difference(prev_img, img)
+        bbox = diff.getbbox()
+        if bbox is None:
+            return None
+    region = img.crop(bbox)
+    if palette is not None:
+        frame = quantize_frame(region, palette)
+    else:
+        frame = region.convert("P", palette=Image.Palette.ADAPTIVE, colors=255)
+        frame.putpalette(frame.getpalette()[:255 * 3] + [0, 0, 0] * (256 - 255))
+    use_transparency = prev_img is not None
+    if use_transparency:
+        # 範囲内で前フレームと同じ画素は透過（前フレームの表示をそのまま残す）
+        r, g, b = diff.crop(bbox).split()
+        changed = ImageChops.lighter(ImageChops.lighter(r, g), b)
+        unchanged = changed.point(lambda v: 255 if v == 0 else 0)
+        frame.paste(TRANSPARENT_INDEX, mask=unchanged)
+    return frame, bbox[:2], use_transparency
+
+# -------------------------------------------------------
+# フレームを1枚ずつ符号化してGIFファイルへ書き出すライター
+# ・保持するのは直前フレーム（差分計算用）と書出し待ちの1フレームのみで、フレーム数に依らずメモリ一定
+# ・直前フレームから変化した範囲だけを切り出し、範囲内で変化していない画素は透過にする
+# ・直前と同一のフレームは書き出さず、表示時間を直前フレームに加算する
+# ・共通パレット指定時はグローバルカラーテーブルだけを書き、各フレームはローカルカラーテーブルを持たない
+# ・差分の減色を別プロセスで済ませた場合は、add_encoded で順番に渡す
+# -------------------------------------------------------
+class StreamingGifWriter:
+    TRANSPARENT_INDEX = TRANSPARENT_INDEX
+
+    def __init__(self, path, size, loop=0, palette=None):
+        self.size = size
+        self.palette = palette  # 共通パレット（Noneならフレームごとに減色）
+        self.fp = open(path, "wb")
+        self.prev_frame = None
+        self.pending = None  # (パレット画像, 位置, 透過あり, 表示時間ms)
+        self.frame_count = 0
+        if palette is None:
+            # ヘッダ（グローバルカラーテーブルなし：各フレームがローカルパレットを持つ）
+            self.fp.write(b"GIF89a" + struct.pack("<HHBBB", size[0], size[1], 0, 0, 0))
+        else:
+            # ヘッダ＋グローバルカラーテーブル（256色分。インデックス255は透過用の空き）
+            colors = palette.getpalette()[:255 * 3]
+            colors += [0, 0, 0] * (256 - len(colors) // 3)
+            self.fp.write(b"GIF89a" + struct.pack("<HHBBB", size[0], size[1], 0xF7, 0, 0))
+            self.fp.write(bytes(colors))
+        # ループ回数（NETSCAPE2.0 拡張）
+        self.fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00")
+
+    def add_frame(self, img, duration):
+        img = prepare_frame(img, self.size)
+        encoded = encode_frame_delta(self.prev_frame, img, self.palette)
+        self.prev_frame = img
+        self.add_encoded(encoded, duration)
+
+    def add_encoded(self, encoded, duration):
+        """encode_frame_delta の結果を書出し順に渡す"""
+        if encoded is None:
+            # 変化なし：直前フレームの表示時間を延ばすだけ
+            self.pending = self.pending[:3] + (self.pending[3] + duration,)
+            return
+        self._flush()
+        self.pending = encoded + (duration,)
+
+    def _flush(self):
+        if self.pending is None:
+            return
+        frame, offset, use_transparency, duration = self.pending
+        params = {"duration": duration, "disposal": 1, "include_color_table": self.palette is None}
+        if use_transparency:
+            params["transparency"] = self.TRANSPARENT_INDEX
+        for chunk in GifImagePlugin.getdata(frame, offset, **params):
+            self.fp.write(chunk)
+        self.pending = None
+        self.frame_count += 1
+
+    def close(self):
+        if self.fp is None:
+            return
+        self._flush()
+        self.fp.write(b";")
+        self.fp.close()
+        self.fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.fp.close()
+            self.fp = None
+
+# プレビュー再生時に、再生位置より先に読み込んでおくフレーム数
+PREVIEW_PREFETCH = 8
+
+# -------------------------------------------------------
+# プレビュー用フレームの先読みタスク（ワーカースレッドで実行）
+# ・表示サイズに縮小したフレームを QImage にして返す（QPixmap への変換はGUIスレッドで行う）
+# -------------------------------------------------------
+class PreviewFrameSignals(QObject):
+    loaded = pyqtSignal(int, object, object, str)  # 世代番号, (パス, フレーム番号), QImage（失敗時None）, エラー内容
+
+class PreviewFrameTask(QRunnable):
+    def __init__(self, frame_cache, generation, key, size):
+        super().__init__()
+        self.frame_cache = frame_cache
+        self.generation = generation
+        self.key = key
+        self.size = size
+        self.signals = PreviewFrameSignals()
+
+    def run(self):
+        path, frame_index = self.key
+        try:
+            qimage = pil_to_qimage(self.frame_cache.get(path, self.size, frame_index=frame_index))
+        except Exception as e:
+            self.signals.loaded.emit(self.generation, self.key, None, str(e))
+            return
+        self.signals.loaded.emit(self.generation, self.key, qimage, "")
+
+# -------------------------------------------------------
+# 入力の展開タスク（ワーカースレッドで実行）
+# ・アニメーション画像の表示時間の読み取り（全フレームのデコードを伴う）をGUIスレッドで行わない
+# ・スレッド1本のプールで実行し、追加した順に結果を返す
+# -------------------------------------------------------
+class ExpandInputSignals(QObject):
+    expanded = pyqtSignal(str, object, str)  # 入力パス, [(パス, フレーム番号, 表示時間ms)]（失敗時None）, エラー内容
+
+class ExpandInputTask(QRunnable):
+    def __init__(self, path, fps, source_fps):
+        super().__init__()
+        self.path = path
+        self.fps = fps
+        self.source_fps = source_fps
+        self.signals = ExpandInputSignals()
+
+    def run(self):
+        try:
+            frames = expand_input(self.path, self.fps, self.source_fps)
+        except Exception as e:
+            self.signals.expanded.emit(self.path, None, str(e))
+            return
+        self.signals.expanded.emit(self.path, frames, "")
+
+# -------------------------------------------------------
+# サムネイルの読み込みタスク（ワーカースレッドで実行）
+# ・フレームを追加した時点ではデコードせず、順に読み込んでウィジェットに渡す
+# -------------------------------------------------------
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(object)  # QImage（失敗時None）
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, frame_cache, file_path, frame_index):
+        super().__init__()
+        self.frame_cache = frame_cache
+        self.file_path = file_path
+        self.frame_index = frame_index
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        try:
+            # アスペクト比を維持して縮小（デコード結果はキャッシュに残り、書出し時に再利用される）
+            thumb = self.frame_cache.get(self.file_path, (100, 100), fit=True, frame_index=self.frame_index)
+            qimage = pil_to_qimage(thumb)
+        except Exception:
+            qimage = None
+        self.signals.loaded.emit(qimage)
 
 # -------------------------------------------------------
 # 各フレーム用ウィジェット
-# ・サムネイル画像（固定サイズ100x100）を表示
+# ・サムネイル画像（固定サイズ100x100）を表示（ThumbnailTask の読み込み完了後）
 # ・下部にフレーム数指定用スピンボックス（デフォルト60＝1秒相当）
 # ・削除ボタン「×」
+# ・アニメーション画像から取り込んだフレームは frame_index でフレーム番号を持つ
 # -------------------------------------------------------
 class FrameItemWidget(QWidget):
-    def __init__(self, file_path, parent=None):
+    def __init__(self, file_path, frame_index=0, frame_value=60, parent=None):
         super().__init__(parent)
         self.file_path = file_path
+        self.frame_index = frame_index
         
         # 縦方向レイアウトの設定
         layout = QVBoxLayout()
@@ -46,18 +425,14 @@ class FrameItemWidget(QWidget):
         self.thumb_label = QLabel()
         self.thumb_label.setFixedSize(100, 100)
         self.thumb_label.setAlignment(Qt.AlignCenter)
-        pix = QPixmap(file_path)
-        if not pix.isNull():
-            # アスペクト比を維持してリサイズ
-            pix = pix.scaled(self.thumb_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.thumb_label.setPixmap(pix)
+        self.thumb_task = None  # 読み込み中のサムネイル（完了通知を受け取るまで保持）
         layout.addWidget(self.thumb_label)
         
         # 下部：スピンボックスと削除ボタン
         h_layout = QHBoxLayout()
         self.spin_box = QSpinBox()
         self.spin_box.setRange(1, 10000)  # フレーム数の範囲
-        self.spin_box.setValue(60)        # デフォルトは60（1秒相当、60fps換算）
+        self.spin_box.setValue(frame_value)  # デフォルトは60（1秒相当、60fps換算）
         h_layout.addWidget(self.spin_box)
         
         self.remove_button = QPushButton("×")
@@ -67,6 +442,11 @@ class FrameItemWidget(QWidget):
         
         self.setLayout(layout)
 
+    def set_thumbnail(self, qimage):
+        self.thumb_task = None
+        if qimage is not None:
+            self.thumb_label.setPixmap(QPixmap.fromImage(qimage))
+
 # -------------------------------------------------------
 # QListWidget のサブクラス
 # ・アイコンモードでグリッド表示（横並び、折り返し）
@@ -117,12 +497,37 @@ class GIFCreatorApp(QWidget):
         super().__init__()
         self.setWindowTitle("GIF画像作成ツール")
         self.setGeometry(100, 100, 800, 700)
-        self.max_frames = 120  # 最大登録枚数
-        self.preview_frames = []      # プレビュー用の QPixmap リスト
-        self.preview_durations = []   # 各フレームの表示時間（ミリ秒）
+        self.max_frames = 10000  # 最大登録枚数（動画・連番から取り込んだフレームも含む）
+        self.frame_cache = FrameCache()  # サムネイル・プレビュー・書出しで共有
+        self.preview_items = []       # 再生するフレームの (パス, 表示時間ms) リスト
         self.preview_index = 0
+        self.preview_playing = False
+        self.preview_waiting = False  # 表示するフレームの先読み完了待ち
+        self.preview_target_size = None   # 1枚目の画像サイズ
+        self.preview_display_size = None  # プレビュー領域に収まる表示サイズ
+        self.preview_pixmaps = {}     # (パス, フレーム番号) → 表示サイズに縮小済みの QPixmap（再生位置から先読み分だけ保持）
+        self.preview_tasks = {}       # 先読み中の (パス, フレーム番号) → タスク
+        self.preview_generation = 0   # 表示サイズが変わるたびに増やし、古い先読み結果を捨てる
+        self.preview_pool = QThreadPool(self)
+        self.preview_pool.setMaxThreadCount(1)
+        self.ingest_pool = QThreadPool(self)  # 入力の展開（追加した順に処理するため1本）
+        self.ingest_pool.setMaxThreadCount(1)
+        self.ingest_tasks = []        # 展開中のタスク（完了通知を受け取るまで保持）
+        self.ingest_truncated = False # 上限を超えて追加しなかったフレームがある
+        self.thumb_pool = QThreadPool(self)   # サムネイルの読み込み
+        self.thumb_pool.setMaxThreadCount(1)
         self.animation_timer = QTimer(self)
+        self.animation_timer.setSingleShot(True)
         self.animation_timer.timeout.connect(self.update_preview_frame)
+        self.export_executor = None   # 共通パレット書出し中のプロセスプール
+        self.export_futures = []      # 書出し順の (future, 表示時間ms)。最大 export_window 件
+        self.export_frames = None     # まだ投入していないフレームを返すイテレータ
+        self.export_prev = None       # 最後に投入したフレーム（次のフレームの差分元）
+        self.export_writer = None
+        self.export_paths = None      # (書込み中の .part, 出力先)
+        self.export_timer = QTimer(self)
+        self.export_timer.setInterval(50)
+        self.export_timer.timeout.connect(self.poll_export)
         self.initUI()
         
     def initUI(self):
@@ -140,6 +545,12 @@ class GIFCreatorApp(QWidget):
         self.export_button = QPushButton("書出し")
         self.export_button.clicked.connect(self.export_gif)
         bottom_layout.addWidget(self.export_button)
+        self.stream_checkbox = QCheckBox("省メモリ書出し")
+        self.stream_checkbox.setToolTip("フレームを1枚ずつ符号化し、変化した部分だけを書き出します")
+        bottom_layout.addWidget(self.stream_checkbox)
+        self.palette_checkbox = QCheckBox("共通パレット")
+        self.palette_checkbox.setToolTip("全フレームから作った1つのパレットで減色します（減色は並列処理）")
+        bottom_layout.addWidget(self.palette_checkbox)
         self.preview_button = QPushButton("プレビュー")
         self.preview_button.clicked.connect(self.preview_gif)
         bottom_layout.addWidget(self.preview_button)
@@ -151,10 +562,27 @@ class GIFCreatorApp(QWidget):
         self.gif_preview_label.setFixedHeight(200)
         main_layout.addWidget(self.gif_preview_label)
         
-        # 画像追加ボタン（ファイル選択）
+        # 画像追加ボタン（ファイル選択・連番画像フォルダ選択）と、複数フレーム入力の取込み設定
+        add_layout = QHBoxLayout()
         self.add_button = QPushButton("画像を追加")
         self.add_button.clicked.connect(self.open_file_dialog)
-        main_layout.addWidget(self.add_button)
+        add_layout.addWidget(self.add_button)
+        self.add_folder_button = QPushButton("連番フォルダを追加")
+        self.add_folder_button.clicked.connect(self.open_folder_dialog)
+        add_layout.addWidget(self.add_folder_button)
+        add_layout.addWidget(QLabel("取込fps"))
+        self.sample_fps_spin = QSpinBox()
+        self.sample_fps_spin.setRange(1, 60)
+        self.sample_fps_spin.setValue(15)
+        self.sample_fps_spin.setToolTip("アニメーション画像・連番フォルダからフレームを取り込む間隔")
+        add_layout.addWidget(self.sample_fps_spin)
+        add_layout.addWidget(QLabel("連番fps"))
+        self.source_fps_spin = QSpinBox()
+        self.source_fps_spin.setRange(1, 240)
+        self.source_fps_spin.setValue(30)
+        self.source_fps_spin.setToolTip("連番フォルダの元の再生fps")
+        add_layout.addWidget(self.source_fps_spin)
+        main_layout.addLayout(add_layout)
         
         self.setLayout(main_layout)
         self.setAcceptDrops(True)
@@ -175,32 +603,59 @@ class GIFCreatorApp(QWidget):
     # --- ファイル選択による画像追加 ---
     def open_file_dialog(self):
         files, _ = QFileDialog.getOpenFileNames(
-            self, "画像ファイルを選択", "", "Image Files (*.png *.jpg *.jpeg)"
+            self, "画像ファイルを選択", "",
+            "Image Files (*.png *.jpg *.jpeg *.gif *.apng *.webp)"
         )
         self.add_images(files)
+
+    def open_folder_dialog(self):
+        folder = QFileDialog.getExistingDirectory(self, "連番画像のフォルダを選択")
+        if folder:
+            self.add_images([folder])
         
     def add_images(self, files):
-        # 対応拡張子のみを抽出
-        valid_files = [f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        if not valid_files:
-            return
+        # 静止画は1フレーム、アニメーション画像と連番フォルダは取込fpsで間引いて複数フレームとして追加
+        # （展開はワーカースレッドで行い、結果は on_input_expanded で追加した順に受け取る）
+        fps = self.sample_fps_spin.value()
+        source_fps = self.source_fps_spin.value()
+        for f in files:
+            task = ExpandInputTask(f, fps, source_fps)
+            task.signals.expanded.connect(self.on_input_expanded)
+            self.ingest_tasks.append(task)
+            self.ingest_pool.start(task)
+
+    def on_input_expanded(self, path, frames, error):
+        self.ingest_tasks.pop(0)  # スレッド1本で処理するので、結果は追加した順に届く
+        if frames is None:
+            QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {error}")
+            frames = []
         current_count = self.listWidget.count()
-        for f in valid_files:
+        for frame_path, frame_index, duration_ms in frames:
             if current_count >= self.max_frames:
+                self.ingest_truncated = True
                 break
-            self.add_frame_item(f)
+            # 表示時間を60fps換算のフレーム数に戻す
+            self.add_frame_item(frame_path, frame_index, max(1, int(round(duration_ms * 60 / 1000))))
             current_count += 1
+        if self.ingest_tasks:
+            return  # 続けて追加した入力の展開待ち
+        if self.ingest_truncated:
+            self.ingest_truncated = False
+            QMessageBox.information(self, "情報", f"フレーム数の上限（{self.max_frames}枚）までを追加しました。")
         # 初回追加の場合、出力ファイル名の初期値を1枚目の画像名（拡張子除く）に設定
         if self.listWidget.count() > 0 and not self.name_line.text():
             first_item = self.listWidget.item(0)
             widget = self.listWidget.itemWidget(first_item)
             base = os.path.splitext(os.path.basename(widget.file_path))[0]
             self.name_line.setText(base)
-            
-    def add_frame_item(self, file_path):
+
+    def add_frame_item(self, file_path, frame_index=0, frame_value=60):
         # QListWidgetItem とカスタムウィジェットの組み合わせでアイテムを追加
         item = QListWidgetItem()
-        widget = FrameItemWidget(file_path)
+        widget = FrameItemWidget(file_path, frame_index, frame_value)
+        widget.thumb_task = ThumbnailTask(self.frame_cache, file_path, frame_index)
+        widget.thumb_task.signals.loaded.connect(widget.set_thumbnail)
+        self.thumb_pool.start(widget.thumb_task)
         # 削除ボタン押下時、該当アイテムを削除し再レイアウト
         widget.remove_button.clicked.connect(lambda: self.remove_frame_item(item))
         item.setSizeHint(widget.sizeHint())
@@ -219,15 +674,14 @@ class GIFCreatorApp(QWidget):
         if count == 0:
             QMessageBox.information(self, "情報", "画像が登録されていません。")
             return
-        # 1枚目の画像サイズを基準とする
+        # 1枚目の画像サイズを基準とする（ヘッダのみ参照）
         first_item = self.listWidget.item(0)
         widget = self.listWidget.itemWidget(first_item)
         try:
-            base_image = Image.open(widget.file_path)
+            target_size = self.frame_cache.image_size(widget.file_path)
         except Exception as e:
             QMessageBox.warning(self, "エラー", f"1枚目の画像の読み込みに失敗しました: {str(e)}")
             return
-        target_size = base_image.size
         
         # 画像サイズの不一致があれば警告（処理は続行）
         size_mismatch = False
@@ -235,8 +689,7 @@ class GIFCreatorApp(QWidget):
             item = self.listWidget.item(i)
             widget = self.listWidget.itemWidget(item)
             try:
-                img = Image.open(widget.file_path)
-                if img.size != target_size:
+                if self.frame_cache.image_size(widget.file_path) != target_size:
                     size_mismatch = True
                     break
             except Exception:
@@ -246,25 +699,8 @@ class GIFCreatorApp(QWidget):
                 self, "警告",
                 "登録されている画像のサイズが異なります。\nすべて1枚目の画像サイズにリサイズしてGIFを作成します。"
             )
-        frames = []
-        durations = []
-        # 各画像を読み込み、必要ならリサイズしてフレームリストに追加
-        for i in range(count):
-            item = self.listWidget.item(i)
-            widget = self.listWidget.itemWidget(item)
-            try:
-                img = Image.open(widget.file_path)
-            except Exception as e:
-                QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {str(e)}")
-                return
-            if img.size != target_size:
-                img = img.resize(target_size, resample_filter)
-            frames.append(img.convert("RGB"))
-            spin_value = widget.spin_box.value()
-            duration_ms = int((spin_value / 60.0) * 1000)  # 60fps換算でミリ秒に変換
-            durations.append(duration_ms)
-        
         # 出力ファイル名は、一番最初の画像のフォルダに保存する
+        widget = self.listWidget.itemWidget(first_item)
         folder = os.path.dirname(widget.file_path)
         out_name = self.name_line.text().strip()
         if not out_name:
@@ -272,6 +708,31 @@ class GIFCreatorApp(QWidget):
         if not out_name.lower().endswith(".gif"):
             out_name += ".gif"
         out_path = os.path.join(folder, out_name)
+        palette = None
+        if self.palette_checkbox.isChecked():
+            try:
+                palette = self.build_export_palette(target_size)
+            except Exception as e:
+                QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {str(e)}")
+                return
+        if self.stream_checkbox.isChecked():
+            self.export_gif_streaming(out_path, target_size, palette)
+            return
+        
+        if palette is not None:
+            self.start_parallel_export(out_path, target_size, palette)
+            return
+        
+        frames = []
+        durations = []
+        # キャッシュからリサイズ済みのフレームを取得してフレームリストに追加
+        try:
+            for img, duration_ms in self.iter_export_frames(target_size):
+                frames.append(img)
+                durations.append(duration_ms)
+        except Exception as e:
+            QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {str(e)}")
+            return
         try:
             frames[0].save(
                 out_path, save_all=True, append_images=frames[1:], duration=durations, loop=0
@@ -279,73 +740,282 @@ class GIFCreatorApp(QWidget):
             QMessageBox.information(self, "成功", f"GIF画像を書出しました: {out_path}")
         except Exception as e:
             QMessageBox.warning(self, "エラー", f"GIF書出しに失敗しました: {str(e)}")
+
+    def export_gif_streaming(self, out_path, target_size, palette=None):
+        """フレームを1枚ずつ読み込み・符号化して書き出す（省メモリ）"""
+        # .part に書いてから置き換えるので、失敗しても既存の出力ファイルは壊れない
+        part_path = out_path + ".part"
+        try:
+            with StreamingGifWriter(part_path, target_size, loop=0, palette=palette) as writer:
+                for img, duration_ms in self.iter_export_frames(target_size):
+                    writer.add_frame(img, duration_ms)
+            os.replace(part_path, out_path)
+        except Exception as e:
+            # 書きかけのファイルは残さない
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            QMessageBox.warning(self, "エラー", f"GIF書出しに失敗しました: {str(e)}")
+            return
+        QMessageBox.information(self, "成功", f"GIF画像を書出しました: {out_path}")
+
+    # --- 共通パレット書出し：差分の減色をプロセスプールに1フレームずつ投入し、タイマーで完了順に書き込む ---
+    # ・フレームの読み込みは投入する直前に行い、未完了のタスクは export_window 件までに抑える
+    #   （GUIスレッドで一度に読み込むのは数フレームだけで、メモリもフレーム数に依らず一定）
+    def start_parallel_export(self, out_path, target_size, palette):
+        part_path = out_path + ".part"
+        try:
+            self.export_writer = StreamingGifWriter(part_path, target_size, loop=0, palette=palette)
+        except Exception as e:
+            QMessageBox.warning(self, "エラー", f"GIF書出しに失敗しました: {str(e)}")
+            return
+        self.export_paths = (part_path, out_path)
+        workers = os.cpu_count() or 1
+        self.export_executor = ProcessPoolExecutor(max_workers=workers)
+        self.export_window = workers * EXPORT_IN_FLIGHT_PER_WORKER
+        self.export_frames = self.iter_export_frames(target_size)
+        self.export_prev = None
+        self.export_size = target_size
+        self.export_palette = palette
+        self.export_total = self.listWidget.count()
+        self.export_done = 0
+        self.export_button.setEnabled(False)
+        self.export_button.setText(f"書出し中... 0/{self.export_total}")
+        try:
+            self.submit_export_frames()
+        except Exception as e:
+            self.finish_parallel_export(success=False)
+            QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {str(e)}")
+            return
+        self.export_timer.start()
+
+    def submit_export_frames(self):
+        """未完了のタスクが export_window 件になるまで、次のフレームを読み込んで投入する"""
+        while self.export_frames is not None and len(self.export_futures) < self.export_window:
+            try:
+                img, duration_ms = next(self.export_frames)
+            except StopIteration:
+                self.export_frames = None
+                break
+            img = prepare_frame(img, self.export_size)
+            future = self.export_executor.submit(encode_frame_delta, self.export_prev, img, self.export_palette)
+            self.export_futures.append((future, duration_ms))
+            self.export_prev = img
+
+    def poll_export(self):
+        # 書出し順を守るため、先頭から続けて完了している分だけ書き込み、空いた分を補充する
+        try:
+            while self.export_futures and self.export_futures[0][0].done():
+                future, duration_ms = self.export_futures.pop(0)
+                self.export_writer.add_encoded(future.result(), duration_ms)
+                self.export_done += 1
+            self.submit_export_frames()
+        except Exception as e:
+            self.finish_parallel_export(success=False)
+            QMessageBox.warning(self, "エラー", f"GIF書出しに失敗しました: {str(e)}")
+            return
+        self.export_button.setText(f"書出し中... {self.export_done}/{self.export_total}")
+        if not self.export_futures and self.export_frames is None:
+            out_path = self.export_paths[1]
+            try:
+                self.finish_parallel_export(success=True)
+            except Exception as e:
+                QMessageBox.warning(self, "エラー", f"GIF書出しに失敗しました: {str(e)}")
+                return
+            QMessageBox.information(self, "成功", f"GIF画像を書出しました: {out_path}")
+
+    def finish_parallel_export(self, success):
+        """書出しを終える。成功なら .part を出力先に置き換え、失敗・中止なら書きかけのファイルを消す"""
+        self.export_timer.stop()
+        # 未着手のタスクは破棄（実行中のものは終了を待たずに切り離す）
+        self.export_executor.shutdown(wait=False, cancel_futures=True)
+        self.export_executor = None
+        self.export_futures = []
+        self.export_frames = None
+        self.export_prev = None
+        self.export_button.setEnabled(True)
+        self.export_button.setText("書出し")
+        writer, self.export_writer = self.export_writer, None
+        part_path, out_path = self.export_paths
+        self.export_paths = None
+        if success:
+            try:
+                writer.close()
+                os.replace(part_path, out_path)
+                return
+            except Exception:
+                self.discard_export(writer, part_path)
+                raise
+        self.discard_export(writer, part_path)
+
+    @staticmethod
+    def discard_export(writer, part_path):
+        if writer.fp is not None:
+            writer.fp.close()
+            writer.fp = None
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    def build_export_palette(self, target_size):
+        """登録フレームから均等にサンプルを取り、共通パレットを作る"""
+        count = self.listWidget.count()
+        samples = []
+        for i in sample_indices(count):
+            widget = self.listWidget.itemWidget(self.listWidget.item(i))
+            samples.append(self.frame_cache.get(widget.file_path, target_size, frame_index=widget.frame_index))
+        return build_global_palette(samples)
+
+    def iter_export_frames(self, target_size):
+        """
+        書出し用に (RGBフレーム, 表示時間ms) を先頭から1枚ずつ返すイテレータ。
+        登録内容は呼び出した時点のものを使い、フレームの読み込みは取り出すたびに行う。
+        """
+        refs = []
+        for i in range(self.listWidget.count()):
+            widget = self.listWidget.itemWidget(self.listWidget.item(i))
+            spin_value = widget.spin_box.value()
+            duration_ms = int((spin_value / 60.0) * 1000)  # 60fps換算でミリ秒に変換
+            refs.append((widget.file_path, widget.frame_index, duration_ms))
+        return self.load_export_frames(refs, target_size)
+
+    def load_export_frames(self, refs, target_size):
+        for path, frame_index, duration_ms in refs:
+            img = self.frame_cache.get(path, target_size, frame_index=frame_index)
+            yield (img if img.mode == "RGB" else img.convert("RGB")), duration_ms
             
     # --- GIF プレビュー ---
     def preview_gif(self):
         """
         プレビューボタン押下時の処理。
         ・既にプレビュー中の場合は停止（タイマーを停止してプレビュー領域にテキストを表示）。
-        ・プレビュー中でなければ、登録画像からGIF用フレームと表示時間を生成し、
-          タイマーでループ再生を開始する。
+        ・プレビュー中でなければ、登録画像の並びと表示時間を控えてすぐに再生を開始する。
+          フレームはワーカースレッドで表示サイズに縮小しながら先読みする。
         """
-        # すでにタイマーが動作中なら停止し、プレビュー領域に「プレビュー領域」と表示して終了
-        if self.animation_timer.isActive():
-            self.animation_timer.stop()
-            self.gif_preview_label.setText("プレビュー領域")
+        # すでに再生中なら停止し、プレビュー領域に「プレビュー領域」と表示して終了
+        if self.preview_playing:
+            self.stop_preview()
             return
         
         count = self.listWidget.count()
         if count == 0:
             QMessageBox.information(self, "情報", "画像が登録されていません。")
             return
-        # 基準サイズは1枚目の画像サイズ
+        # 基準サイズは1枚目の画像サイズ（ヘッダのみ参照）
         first_item = self.listWidget.item(0)
         widget = self.listWidget.itemWidget(first_item)
         try:
-            base_image = Image.open(widget.file_path)
+            self.preview_target_size = self.frame_cache.image_size(widget.file_path)
         except Exception as e:
             QMessageBox.warning(self, "エラー", f"1枚目の画像の読み込みに失敗しました: {str(e)}")
             return
-        target_size = base_image.size
         
-        self.preview_frames = []
-        self.preview_durations = []
-        # 登録画像からGIF用のフレームと表示時間のリストを作成
+        self.preview_items = []
         for i in range(count):
-            item = self.listWidget.item(i)
-            widget = self.listWidget.itemWidget(item)
-            try:
-                img = Image.open(widget.file_path)
-            except Exception as e:
-                QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {str(e)}")
-                return
-            if img.size != target_size:
-                img = img.resize(target_size, resample_filter)
-            # PIL Image を QPixmap に変換（ヘルパー関数pil2pixmapを使用）
-            pix = pil2pixmap(img)
-            self.preview_frames.append(pix)
+            widget = self.listWidget.itemWidget(self.listWidget.item(i))
             spin_value = widget.spin_box.value()
             duration_ms = int((spin_value / 60.0) * 1000)
-            self.preview_durations.append(duration_ms)
-        if not self.preview_frames:
-            return
+            self.preview_items.append(((widget.file_path, widget.frame_index), duration_ms))
         
-        # 初回フレームを表示
+        self.update_preview_display_size()
+        self.preview_playing = True
         self.preview_index = 0
-        self.gif_preview_label.setPixmap(self.preview_frames[0].scaled(
-            self.gif_preview_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-        # タイマー開始
-        self.animation_timer.start(self.preview_durations[0])
+        self.show_preview_frame()
+
+    def stop_preview(self):
+        self.preview_playing = False
+        self.preview_waiting = False
+        self.animation_timer.stop()
+        self.gif_preview_label.setText("プレビュー領域")
+
+    def update_preview_display_size(self):
+        """1枚目の縦横比を保ってプレビュー領域に収まるサイズを求め、変わっていれば縮小済みフレームを破棄する"""
+        target_w, target_h = self.preview_target_size
+        label_w, label_h = self.gif_preview_label.width(), self.gif_preview_label.height()
+        scale = min(label_w / target_w, label_h / target_h)
+        size = (max(1, int(target_w * scale)), max(1, int(target_h * scale)))
+        if size != self.preview_display_size:
+            self.preview_display_size = size
+            self.preview_pixmaps.clear()
+            self.preview_tasks.clear()
+            self.preview_generation += 1
+
+    def request_preview_frames(self, start):
+        """再生位置 start から PREVIEW_PREFETCH 枚のうち、未読み込みのフレームを先読みに出す"""
+        count = len(self.preview_items)
+        for offset in range(min(PREVIEW_PREFETCH, count)):
+            key = self.preview_items[(start + offset) % count][0]
+            if key in self.preview_pixmaps or key in self.preview_tasks:
+                continue
+            task = PreviewFrameTask(self.frame_cache, self.preview_generation, key, self.preview_display_size)
+            task.signals.loaded.connect(self.on_preview_frame_loaded)
+            self.preview_tasks[key] = task
+            self.preview_pool.start(task)
+
+    def on_preview_frame_loaded(self, generation, key, qimage, error):
+        if generation != self.preview_generation:
+            return  # 表示サイズ変更前の古い結果
+        self.preview_tasks.pop(key, None)
+        if qimage is None:
+            if self.preview_playing:
+                self.stop_preview()
+                QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {error}")
+            return
+        self.preview_pixmaps[key] = QPixmap.fromImage(qimage)
+        if self.preview_waiting and self.preview_items[self.preview_index][0] == key:
+            self.show_preview_frame()
+
+    def show_preview_frame(self):
+        """現在のフレームを表示してタイマーを設定する。未読み込みなら読み込み完了まで待つ。"""
+        if not self.preview_playing or not self.preview_items:
+            return
+        key, duration_ms = self.preview_items[self.preview_index]
+        pix = self.preview_pixmaps.get(key)
+        if pix is None:
+            self.preview_waiting = True
+            self.request_preview_frames(self.preview_index)
+            return
+        self.preview_waiting = False
+        self.gif_preview_label.setPixmap(pix)
+        self.animation_timer.start(duration_ms)
+        self.trim_preview_pixmaps()
+        self.request_preview_frames(self.preview_index + 1)
+
+    def trim_preview_pixmaps(self):
+        """表示中のフレームと、その先 PREVIEW_PREFETCH 枚以外の縮小済みフレームを破棄する（再生済みの分を持ち続けない）"""
+        count = len(self.preview_items)
+        keep = {self.preview_items[(self.preview_index + offset) % count][0]
+                for offset in range(min(PREVIEW_PREFETCH + 1, count))}
+        for key in [key for key in self.preview_pixmaps if key not in keep]:
+            del self.preview_pixmaps[key]
         
     def update_preview_frame(self):
-        """タイマー更新時に次のフレームを表示し、タイマーを再設定する。"""
-        if not self.preview_frames:
+        """タイマー更新時に次のフレームへ進める。"""
+        if not self.preview_items:
             return
-        self.preview_index = (self.preview_index + 1) % len(self.preview_frames)
-        pix = self.preview_frames[self.preview_index].scaled(
-            self.gif_preview_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.gif_preview_label.setPixmap(pix)
-        self.animation_timer.start(self.preview_durations[self.preview_index])
+        self.preview_index = (self.preview_index + 1) % len(self.preview_items)
+        self.show_preview_frame()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # プレビュー領域のサイズが変わったら、縮小済みフレームを作り直す
+        if self.preview_playing:
+            self.update_preview_display_size()
+            if self.preview_index < len(self.preview_items) and \
+                    self.preview_items[self.preview_index][0] not in self.preview_pixmaps:
+                self.request_preview_frames(self.preview_index)
+
+    def closeEvent(self, event):
+        if self.export_executor is not None:
+            self.finish_parallel_export(success=False)
+        self.stop_preview()
+        self.preview_generation += 1
+        # 未着手の展開・サムネイル読み込みは破棄し、実行中のものだけ終了を待つ
+        self.ingest_pool.clear()
+        self.thumb_pool.clear()
+        self.ingest_pool.waitForDone()
+        self.thumb_pool.waitForDone()
+        self.preview_pool.waitForDone()
+        self.frame_cache.close_sequence()
+        super().closeEvent(event)
 
 # -------------------------------------------------------
 # 未処理例外発生時にエラーダイアログを表示するグローバル例外ハンドラ
@@ -365,6 +1035,7 @@ sys.excepthook = excepthook
 # アプリケーションエントリポイント
 # -------------------------------------------------------
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # exe化した場合のプロセスプール対応
     app = QApplication(sys.argv)
     ex = GIFCreatorApp()
     ex.show()
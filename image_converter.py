@@ -1,11 +1,16 @@
-import sys, os, traceback
+import sys, os, time, traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, 
-    QHBoxLayout, QCheckBox, QListWidget, QLineEdit, QSlider, QMessageBox
+    QHBoxLayout, QCheckBox, QListWidget, QLineEdit, QSlider, QMessageBox,
+    QSpinBox, QProgressBar
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtGui import QDragEnterEvent, QPixmap
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image
+from image_converter_core import FORMATS, apply_adjustments, convert_file, sepia_tone
+from pil_qt_bridge import pil_to_qimage
 
 # -------------------------------
 # グローバル例外ハンドラ
@@ -21,6 +26,40 @@ def global_excepthook(exc_type, exc_value, exc_tb):
 
 sys.excepthook = global_excepthook
 
+# -------------------------------
+# プレビュー描画タスク（ワーカースレッドで実行）
+# ・世代番号が最新でなくなったら、調整ステージの合間で描画を打ち切る
+# -------------------------------
+class PreviewSignals(QObject):
+    finished = pyqtSignal(int, object, float)  # 世代番号, QImage（中断時はNone）, 所要時間(ms)
+    failed = pyqtSignal(int, str)
+
+class PreviewRenderTask(QRunnable):
+    def __init__(self, owner, generation, file_path, target_size, params):
+        super().__init__()
+        self.owner = owner
+        self.generation = generation
+        self.file_path = file_path
+        self.target_size = target_size
+        self.params = params
+        self.signals = PreviewSignals()
+
+    def is_stale(self):
+        return self.generation != self.owner.preview_generation
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            proxy, scale = self.owner.get_preview_proxy(self.file_path, self.target_size)
+            params = dict(self.params)
+            params["blur"] = params["blur"] * scale  # 縮小率に合わせてぼかし半径を補正
+            img = apply_adjustments(proxy, params, cancelled=self.is_stale)
+            qimage = pil_to_qimage(img) if img is not None else None
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, qimage, (time.perf_counter() - start) * 1000)
+
 # -------------------------------
 # 画像編集＆変換ツールクラス
 # -------------------------------
@@ -30,6 +69,24 @@ class ImageConverterApp(QWidget):
         self.setWindowTitle("画像編集＆変換ツール")
         self.resize(800, 600)
         self.file_paths = []  # 追加された画像ファイルのパスリスト
+        self.preview_proxy = None  # プレビュー用の縮小画像
+        self.preview_proxy_key = None  # (パス, 更新日時, ラベルサイズ)
+        self.preview_scale = 1.0
+        # プレビュー描画：スライダー操作をまとめてから1スレッドで描画する
+        self.preview_generation = 0  # パラメータが変わるたびに増やす
+        self.preview_running = False
+        self.preview_task = None
+        self.preview_pool = QThreadPool(self)
+        self.preview_pool.setMaxThreadCount(1)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(30)
+        self.preview_timer.timeout.connect(self.start_preview_render)
+        self.executor = None  # 並列変換中のプロセスプール
+        self.pending_futures = {}  # 実行中のFuture → ファイルパス
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(50)
+        self.poll_timer.timeout.connect(self.poll_conversion)
         self.initUI()
 
     def initUI(self):
@@ -55,7 +112,7 @@ class ImageConverterApp(QWidget):
         format_label = QLabel("変換先の形式:")
         format_label.setFixedWidth(120)
         format_layout.addWidget(format_label)
-        self.formats = ["png", "jpeg", "bmp", "gif", "tiff", "webp", "ico", "pdf", "svg", "hdr", "psd"]
+        self.formats = FORMATS
         self.format_checkboxes = []
         for fmt in self.formats:
             cb = QCheckBox(fmt.upper())
@@ -124,7 +181,22 @@ class ImageConverterApp(QWidget):
         suffix_layout.addWidget(self.suffix_line)
         main_layout.addLayout(suffix_layout)
 
-        # ボタン群：ファイル選択、変換実行
+        # 並列処理設定：有効/無効とワーカー数
+        parallel_layout = QHBoxLayout()
+        self.cb_parallel = QCheckBox("並列処理")
+        self.cb_parallel.setChecked(True)
+        parallel_layout.addWidget(self.cb_parallel)
+        worker_label = QLabel("ワーカー数:")
+        parallel_layout.addWidget(worker_label)
+        self.worker_spin = QSpinBox()
+        self.worker_spin.setRange(1, 64)
+        self.worker_spin.setValue(os.cpu_count() or 1)
+        self.cb_parallel.toggled.connect(self.worker_spin.setEnabled)
+        parallel_layout.addWidget(self.worker_spin)
+        parallel_layout.addStretch()
+        main_layout.addLayout(parallel_layout)
+
+        # ボタン群：ファイル選択、変換実行、中止
         button_layout = QHBoxLayout()
         self.btn_select = QPushButton("ファイル選択")
         self.btn_select.clicked.connect(self.open_file_dialog)
@@ -132,8 +204,22 @@ class ImageConverterApp(QWidget):
         self.btn_convert = QPushButton("変換")
         self.btn_convert.clicked.connect(self.convert_images)
         button_layout.addWidget(self.btn_convert)
+        self.btn_cancel = QPushButton("中止")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_conversion)
+        button_layout.addWidget(self.btn_cancel)
         main_layout.addLayout(button_layout)
 
+        # 並列変換の進捗とファイルごとのエラー一覧（変換中のみ表示）
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        main_layout.addWidget(self.progress_bar)
+        self.error_list = QListWidget()
+        self.error_list.setFixedHeight(80)
+        self.error_list.setStyleSheet("color: red;")
+        self.error_list.hide()
+        main_layout.addWidget(self.error_list)
+
         # ステータス表示ラベル
         self.status_label = QLabel("")
         self.status_label.setAlignment(Qt.AlignCenter)
@@ -182,80 +268,86 @@ class ImageConverterApp(QWidget):
                 selected.append(fmt)
         return selected
 
+    # -------------------------------
+    # 画像調整パラメータの取得（スライダー・フィルターの現在値）
+    # -------------------------------
+    def get_adjust_params(self):
+        return {
+            "brightness": self.slider_brightness.value(),
+            "contrast": self.slider_contrast.value(),
+            "sharpness": self.slider_sharpness.value(),
+            "blur": self.slider_blur.value(),
+            "hue": self.slider_hue.value(),
+            "monochrome": self.cb_monochrome.isChecked(),
+            "sepia": self.cb_sepia.isChecked(),
+        }
+
     # -------------------------------
     # 画像調整処理：各スライダー・フィルターを適用
     # -------------------------------
     def apply_adjustments(self, img):
-        # 明るさ調整（1.0がデフォルト）
-        brightness = self.slider_brightness.value() / 100.0
-        enhancer = ImageEnhance.Brightness(img)
-        img = enhancer.enhance(brightness)
-        # コントラスト調整
-        contrast = self.slider_contrast.value() / 100.0
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(contrast)
-        # 鮮明度（シャープネス）調整
-        sharpness = self.slider_sharpness.value() / 100.0
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(sharpness)
-        # ぼかし処理
-        blur_radius = self.slider_blur.value()
-        if blur_radius > 0:
-            img = img.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-        # 色相調整：画像をHSVに変換し、H成分にオフセットを加算してRGBに戻す
-        hue_shift = self.slider_hue.value()
-        if hue_shift != 0:
-            hsv = img.convert("HSV")
-            h, s, v = hsv.split()
-            shift = int(hue_shift * 255 / 360)
-            h = h.point(lambda p: (p + shift) % 256)
-            hsv = Image.merge("HSV", (h, s, v))
-            img = hsv.convert("RGB")
-        # モノクロフィルター
-        if self.cb_monochrome.isChecked():
-            img = img.convert("L").convert("RGB")
-        # セピアフィルター
-        if self.cb_sepia.isChecked():
-            img = self.apply_sepia(img)
-        return img
+        return apply_adjustments(img, self.get_adjust_params())
 
     # -------------------------------
     # セピアフィルターの適用
     # -------------------------------
     def apply_sepia(self, img):
-        width, height = img.size
-        pixels = img.load()
-        for py in range(height):
-            for px in range(width):
-                r, g, b = img.getpixel((px, py))
-                tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                pixels[px, py] = (min(255, tr), min(255, tg), min(255, tb))
-        return img
+        return sepia_tone(img)
 
     # -------------------------------
-    # プレビュー更新：最初の画像に調整を即時反映して表示
+    # プレビュー用の縮小画像（プロキシ）を取得（描画スレッドから呼ばれる）
+    # ・ラベルサイズまで先に縮小し（JPEGはデコード時点で縮小）、同じ画像・サイズの間は使い回す
+    # ・戻り値は (縮小画像, 元画像に対する縮小率)
+    # -------------------------------
+    def get_preview_proxy(self, file_path, target_size):
+        key = (file_path, os.path.getmtime(file_path), target_size)
+        if self.preview_proxy_key != key:
+            img = Image.open(file_path)
+            full_width = img.width
+            img.thumbnail(target_size)
+            self.preview_proxy = img
+            self.preview_scale = img.width / full_width
+            self.preview_proxy_key = key
+        return self.preview_proxy, self.preview_scale
+
+    # -------------------------------
+    # プレビュー更新要求：連続した操作はタイマーでまとめ、描画中のものは古い世代として中断させる
     # -------------------------------
     def update_preview(self):
         if not self.file_paths:
             self.status_label.setStyleSheet("color: red;")
             self.status_label.setText("画像が追加されていません！")
             return
-        try:
-            img = Image.open(self.file_paths[0])
-        except Exception as e:
-            QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {str(e)}")
+        self.preview_generation += 1
+        self.preview_timer.start()
+
+    def start_preview_render(self):
+        # 描画中なら完了（または中断）を待ち、完了時に最新のパラメータで描き直す
+        if self.preview_running or not self.file_paths:
             return
-        img = self.apply_adjustments(img)
-        preview_img = img.copy()
-        preview_img.thumbnail((self.preview_label.width(), self.preview_label.height()))
-        temp_file = "temp_preview.png"
-        preview_img.save(temp_file)
-        pix = QPixmap(temp_file)
-        self.preview_label.setPixmap(pix)
-        os.remove(temp_file)
-        self.status_label.setText("プレビュー更新完了！")
+        self.preview_running = True
+        target_size = (self.preview_label.width(), self.preview_label.height())
+        task = PreviewRenderTask(self, self.preview_generation, self.file_paths[0],
+                                 target_size, self.get_adjust_params())
+        task.signals.finished.connect(self.on_preview_rendered)
+        task.signals.failed.connect(self.on_preview_failed)
+        self.preview_task = task
+        self.preview_pool.start(task)
+
+    def on_preview_rendered(self, generation, qimage, elapsed_ms):
+        self.preview_running = False
+        if generation == self.preview_generation and qimage is not None:
+            self.preview_label.setPixmap(QPixmap.fromImage(qimage))
+            self.status_label.setText(f"プレビュー更新完了！（{elapsed_ms:.0f} ms）")
+        elif not self.preview_timer.isActive():
+            self.start_preview_render()
+
+    def on_preview_failed(self, generation, message):
+        self.preview_running = False
+        if generation == self.preview_generation:
+            QMessageBox.warning(self, "エラー", f"画像の読み込みに失敗しました: {message}")
+        elif not self.preview_timer.isActive():
+            self.start_preview_render()
 
     # -------------------------------
     # 画像変換処理：各画像に調整を適用し、選択された各形式に変換
@@ -268,32 +360,21 @@ class ImageConverterApp(QWidget):
             return
         else:
             self.status_label.setStyleSheet("color: black;")
+        params = self.get_adjust_params()
         user_suffix = self.suffix_line.text().strip()
+        # 並列処理が有効なら、プロセスプールでバックグラウンド変換
+        if self.cb_parallel.isChecked() and len(self.file_paths) > 1:
+            self.start_parallel_conversion(params, target_formats, user_suffix)
+            return
         errors = []
         same_format_flag = False
         for file_path in self.file_paths:
-            try:
-                img = Image.open(file_path)
-            except Exception as e:
-                errors.append(f"{file_path}: 画像の読み込みに失敗 ({str(e)})")
-                continue
-            img = self.apply_adjustments(img)
-            dir_name = os.path.dirname(file_path)
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
-            original_ext = os.path.splitext(file_path)[1].lower().replace(".", "")
-            for fmt in target_formats:
-                if fmt == original_ext:
-                    same_format_flag = True
-                    continue  # 同じ形式はスキップ
-                new_file = os.path.join(dir_name, f"{base_name}{user_suffix}.{fmt}")
-                try:
-                    if fmt == "pdf":
-                        img.convert("RGB").save(new_file, "PDF")
-                    else:
-                        img.save(new_file, fmt.upper())
-                except Exception as e:
-                    errors.append(f"{file_path} -> {fmt.upper()}: {str(e)}")
-                    continue
+            file_errors, same_format = convert_file(file_path, params, target_formats, user_suffix)
+            errors.extend(file_errors)
+            same_format_flag = same_format_flag or same_format
+        self.show_conversion_result(errors, same_format_flag)
+
+    def show_conversion_result(self, errors, same_format_flag):
         if errors:
             QMessageBox.warning(self, "変換エラー", "以下のファイル変換に失敗しました:\n" + "\n".join(errors))
         else:
@@ -302,7 +383,76 @@ class ImageConverterApp(QWidget):
                 success_msg += " （同じ形式が選択されているファイルがありました）"
             self.status_label.setText(success_msg)
 
+    # -------------------------------
+    # 並列変換：ProcessPoolExecutorに1ファイルずつ投入し、タイマーで完了分を回収
+    # -------------------------------
+    def start_parallel_conversion(self, params, target_formats, user_suffix):
+        self.executor = ProcessPoolExecutor(max_workers=self.worker_spin.value())
+        self.pending_futures = {}
+        for file_path in self.file_paths:
+            future = self.executor.submit(convert_file, file_path, params, target_formats, user_suffix)
+            self.pending_futures[future] = file_path
+        self.conversion_errors = []
+        self.conversion_same_format = False
+        self.conversion_done = 0
+        self.conversion_total = len(self.file_paths)
+        self.progress_bar.setRange(0, self.conversion_total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.error_list.clear()
+        self.error_list.hide()
+        self.btn_convert.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.status_label.setText(f"変換中... 0/{self.conversion_total}")
+        self.poll_timer.start()
+
+    def poll_conversion(self):
+        finished = [future for future in self.pending_futures if future.done()]
+        for future in finished:
+            file_path = self.pending_futures.pop(future)
+            try:
+                file_errors, same_format = future.result()
+            except Exception as e:
+                file_errors, same_format = [f"{file_path}: {str(e)}"], False
+            # エラーは届いた時点で一覧に追加する
+            for msg in file_errors:
+                self.conversion_errors.append(msg)
+                self.error_list.addItem(msg)
+                self.error_list.show()
+            self.conversion_same_format = self.conversion_same_format or same_format
+            self.conversion_done += 1
+        if finished:
+            self.progress_bar.setValue(self.conversion_done)
+            self.status_label.setText(f"変換中... {self.conversion_done}/{self.conversion_total}")
+        if not self.pending_futures:
+            self.finish_parallel_conversion()
+            self.show_conversion_result(self.conversion_errors, self.conversion_same_format)
+
+    def cancel_conversion(self):
+        if self.executor is None:
+            return
+        self.finish_parallel_conversion()
+        self.status_label.setStyleSheet("color: red;")
+        self.status_label.setText(f"変換を中止しました（{self.conversion_done}/{self.conversion_total} 完了）")
+
+    def finish_parallel_conversion(self):
+        self.poll_timer.stop()
+        # 未着手のタスクは破棄（実行中のものは終了を待たずに切り離す）
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.pending_futures = {}
+        self.btn_convert.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+
+    def closeEvent(self, event):
+        if self.executor is not None:
+            self.finish_parallel_conversion()
+        self.preview_generation += 1  # 描画中のプレビューを打ち切る
+        self.preview_pool.waitForDone()
+        super().closeEvent(event)
+
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # exe化した場合のプロセスプール対応
     app = QApplication(sys.argv)
     ex = ImageConverterApp()
     ex.show()
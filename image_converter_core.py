@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+画像編集＆変換の処理本体（PyQt5 に依存しない）
+・GUI（image_converter.py）と並列変換ワーカー、コマンドライン版から共通で利用する
+・コマンドライン版はフォルダ以下を逐次たどって一括変換する
+
+実行例:
+    python -m image_converter_core 入力フォルダ --formats png webp --hue 30 --sepia
+    python -m image_converter_core 入力フォルダ -o 出力フォルダ --workers 8
+"""
+import sys, os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image, ImageFilter
+
+# 変換先として選択できる形式
+FORMATS = ["png", "jpeg", "bmp", "gif", "tiff", "webp", "ico", "pdf", "svg", "hdr", "psd"]
+
+# 調整パラメータの既定値（すべて無調整）
+DEFAULT_PARAMS = {
+    "brightness": 100,
+    "contrast": 100,
+    "sharpness": 100,
+    "blur": 0,
+    "hue": 0,
+    "monochrome": False,
+    "sepia": False,
+}
+
+# フォルダ走査時に変換対象とする拡張子
+INPUT_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# -------------------------------
+# セピア変換用の色変換行列（3x4：各行は R, G, B 係数とオフセット）
+# -------------------------------
+SEPIA_MATRIX = (
+    0.393, 0.769, 0.189, 0,
+    0.349, 0.686, 0.168, 0,
+    0.272, 0.534, 0.131, 0,
+)
+
+def sepia_tone(img):
+    """画像全体を行列変換でセピア化する（RGBA・パレット画像は透過を保持）"""
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    if has_alpha:
+        rgba = img.convert("RGBA")
+        alpha = rgba.getchannel("A")
+        sepia = rgba.convert("RGB").convert("RGB", SEPIA_MATRIX)
+        sepia.putalpha(alpha)
+        return sepia
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    # 1行列変換で全画素を一括処理（0～255へのクランプはPillow側で行われる）
+    return img.convert("RGB", SEPIA_MATRIX)
+
+# -------------------------------
+# 調整プランの各ステージ
+# ・明るさ＋コントラストは1つのLUTにまとめ、point() 1回で適用する
+# ・無調整（100や0）のステージはプランに含めない
+# ・各ステージは入力1枚から出力1枚を作るだけなので、同時に保持するバッファは2枚程度
+# -------------------------------
+def _blend_value(base, value, factor):
+    # Image.blend と同じく切り捨て＋0～255クランプ
+    v = base + factor * (value - base)
+    if v <= 0:
+        return 0
+    if v >= 255:
+        return 255
+    return int(v)
+
+def _luma_mean(img, tone_lut):
+    """tone_lut 適用後の画像をL変換したときの平均輝度を、ヒストグラムから求める"""
+    hist = img.histogram()
+    if img.mode == "L":
+        total = sum(hist)
+        return sum(n * tone_lut[v] for v, n in enumerate(hist)) / max(total, 1)
+    # L変換と同じ重み（ITU-R 601-2）で各チャンネル平均を合成
+    total = sum(hist[0:256])
+    mean = 0.0
+    for band, weight in enumerate((0.299, 0.587, 0.114)):
+        band_hist = hist[band * 256:(band + 1) * 256]
+        mean += weight * sum(n * tone_lut[v] for v, n in enumerate(band_hist))
+    return mean / max(total, 1)
+
+def _tone_stage(brightness, contrast):
+    def stage(img):
+        tone_lut = [_blend_value(0, v, brightness) for v in range(256)]
+        if contrast != 1.0:
+            # ImageEnhance.Contrast と同じく、明るさ調整後の平均輝度を基準にする
+            mean = int(_luma_mean(img, tone_lut) + 0.5)
+            tone_lut = [_blend_value(mean, t, contrast) for t in tone_lut]
+        lut = tone_lut * len(img.getbands())
+        if "A" in img.getbands():
+            lut[-256:] = range(256)  # 透過チャンネルはそのまま
+        return img.point(lut)
+    return stage
+
+def _sharpness_stage(sharpness):
+    # ImageEnhance.Sharpness（SMOOTHとの合成）を3x3カーネル1回の畳み込みにまとめる
+    edge = 1.0 - sharpness
+    kernel = ImageFilter.Kernel((3, 3), [edge] * 4 + [5 * edge + 13 * sharpness] + [edge] * 4, scale=13)
+    def stage(img):
+        sharpened = img.filter(kernel)
+        if "A" in img.getbands():
+            sharpened.putalpha(img.getchannel("A"))
+        return sharpened
+    return stage
+
+def _blur_stage(radius):
+    def stage(img):
+        return img.filter(ImageFilter.GaussianBlur(radius=radius))
+    return stage
+
+def _hue_stage(hue_shift):
+    # H成分のみずらす 256 エントリのLUT（S, V は恒等）
+    shift = int(hue_shift * 255 / 360)
+    hsv_lut = [(v + shift) % 256 for v in range(256)] + list(range(256)) * 2
+    def stage(img):
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        return img.convert("HSV").point(hsv_lut).convert("RGB")
+    return stage
+
+def _monochrome_stage(sepia):
+    # モノクロ＋セピアはグレー値→セピア色のパレットを当てて1回で変換する
+    palette = None
+    if sepia:
+        palette = []
+        for v in range(256):
+            for row in range(3):
+                r, g, b = SEPIA_MATRIX[row * 4:row * 4 + 3]
+                palette.append(min(255, int(v * (r + g + b) + 0.5)))
+    def stage(img):
+        gray = img.convert("L")
+        if palette is None:
+            return gray.convert("RGB")
+        gray.putpalette(palette)
+        return gray.convert("RGB")
+    return stage
+
+def compile_adjustments(params):
+    """スライダー値から、実際に必要な処理だけを並べた調整プラン（ステージ名と関数のリスト）を作る"""
+    plan = []
+    brightness = params["brightness"] / 100.0
+    contrast = params["contrast"] / 100.0
+    if brightness != 1.0 or contrast != 1.0:
+        plan.append(("tone", _tone_stage(brightness, contrast)))
+    sharpness = params["sharpness"] / 100.0
+    if sharpness != 1.0:
+        plan.append(("sharpness", _sharpness_stage(sharpness)))
+    if params["blur"] > 0:
+        plan.append(("blur", _blur_stage(params["blur"])))
+    if params["hue"] != 0:
+        plan.append(("hue", _hue_stage(params["hue"])))
+    if params["monochrome"]:
+        plan.append(("monochrome", _monochrome_stage(params["sepia"])))
+    elif params["sepia"]:
+        plan.append(("sepia", sepia_tone))
+    return plan
+
+# -------------------------------
+# 画像調整処理：スライダー値（params）に従って各調整・フィルターを適用
+# ・cancelled を渡すと各ステージの前に呼び出し、True なら中断して None を返す
+# -------------------------------
+def apply_adjustments(img, params, plan=None, cancelled=None):
+    if plan is None:
+        plan = compile_adjustments(params)
+    if not plan:
+        return img
+    # パレット画像などはLUT・フィルターが使えないため、先にRGB(A)へそろえる
+    if img.mode not in ("L", "RGB", "RGBA"):
+        has_alpha = "A" in img.getbands() or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    for _name, stage in plan:
+        if cancelled is not None and cancelled():
+            return None
+        img = stage(img)
+    return img
+
+# -------------------------------
+# 1ファイル分の変換処理：読み込み → 調整 → 選択された各形式で保存
+# 戻り値は (エラーメッセージのリスト, 同じ形式をスキップしたか)
+# output_dir を省略した場合は元画像と同じフォルダに保存する
+# -------------------------------
+def convert_file(file_path, params, target_formats, user_suffix, output_dir=None):
+    errors = []
+    same_format_flag = False
+    try:
+        img = Image.open(file_path)
+    except Exception as e:
+        errors.append(f"{file_path}: 画像の読み込みに失敗 ({str(e)})")
+        return errors, same_format_flag
+    img = apply_adjustments(img, params)
+    dir_name = output_dir if output_dir is not None else os.path.dirname(file_path)
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    original_ext = os.path.splitext(file_path)[1].lower().replace(".", "")
+    for fmt in target_formats:
+        if fmt == original_ext:
+            same_format_flag = True
+            continue  # 同じ形式はスキップ
+        new_file = os.path.join(dir_name, f"{base_name}{user_suffix}.{fmt}")
+        try:
+            if fmt == "pdf":
+                img.convert("RGB").save(new_file, "PDF")
+            else:
+                img.save(new_file, fmt.upper())
+        except Exception as e:
+            errors.append(f"{file_path} -> {fmt.upper()}: {str(e)}")
+            continue
+    return errors, same_format_flag
+
+# -------------------------------
+# フォルダ以下の画像ファイルを逐次列挙するジェネレータ
+# ・フォルダ単位で一覧を取ってから返すため、変換結果の書き込み中に同じファイルを再度拾わない
+# ・保持するのは未訪問フォルダのスタックと現在フォルダの一覧のみ
+# -------------------------------
+def iter_image_files(root_dir, recursive=True):
+    stack = [root_dir]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"{current}: フォルダを読み込めません ({str(e)})", file=sys.stderr)
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.lower().endswith(INPUT_EXTENSIONS):
+                yield entry.path
+        if recursive:
+            stack.extend(reversed(subdirs))
+
+# -------------------------------
+# コマンドライン版：引数の解析
+# -------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="image_converter_core",
+        description="フォルダ内の画像に調整を適用し、指定形式で一括変換します。",
+    )
+    parser.add_argument("input_dir", help="入力フォルダ")
+    parser.add_argument("-o", "--output-dir", help="出力フォルダ（省略時は元画像と同じフォルダ。サブフォルダ構成は維持）")
+    parser.add_argument("-f", "--formats", nargs="+", default=["png"], choices=FORMATS, metavar="FMT",
+                        help="変換先の形式（複数可）: " + ", ".join(FORMATS))
+    parser.add_argument("--suffix", default="", help="ファイル名に付与する文字列")
+    parser.add_argument("--brightness", type=int, default=DEFAULT_PARAMS["brightness"], help="明るさ 50～150（既定 100）")
+    parser.add_argument("--contrast", type=int, default=DEFAULT_PARAMS["contrast"], help="コントラスト 50～150（既定 100）")
+    parser.add_argument("--sharpness", type=int, default=DEFAULT_PARAMS["sharpness"], help="鮮明度 50～150（既定 100）")
+    parser.add_argument("--blur", type=int, default=DEFAULT_PARAMS["blur"], help="ぼかし半径 0～20（既定 0）")
+    parser.add_argument("--hue", type=int, default=DEFAULT_PARAMS["hue"], help="色相 -180～180（既定 0）")
+    parser.add_argument("--monochrome", action="store_true", help="モノクロフィルターを適用")
+    parser.add_argument("--sepia", action="store_true", help="セピアフィルターを適用")
+    parser.add_argument("--no-recursive", action="store_true", help="サブフォルダをたどらない")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="並列プロセス数（既定 1）")
+    return parser.parse_args(argv)
+
+# -------------------------------
+# コマンドライン版：変換処理
+# ・並列時も投入済みタスク数を workers の数倍までに抑え、メモリ使用量を一定に保つ
+# -------------------------------
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.isdir(args.input_dir):
+        print(f"{args.input_dir}: フォルダが見つかりません", file=sys.stderr)
+        return 2
+    params = {key: getattr(args, key) for key in DEFAULT_PARAMS}
+    user_suffix = args.suffix.strip()
+
+    def jobs():
+        for file_path in iter_image_files(args.input_dir, recursive=not args.no_recursive):
+            output_dir = None
+            if args.output_dir:
+                rel_dir = os.path.relpath(os.path.dirname(file_path), args.input_dir)
+                output_dir = os.path.normpath(os.path.join(args.output_dir, rel_dir))
+                os.makedirs(output_dir, exist_ok=True)
+            yield file_path, output_dir
+
+    converted = 0
+    errors = []
+
+    def report(file_path, file_errors):
+        nonlocal converted
+        converted += 1
+        for msg in file_errors:
+            errors.append(msg)
+            print(msg, file=sys.stderr)
+        print(f"[{converted}] {file_path}")
+
+    if args.workers <= 1:
+        for file_path, output_dir in jobs():
+            file_errors, _ = convert_file(file_path, params, args.formats, user_suffix, output_dir)
+            report(file_path, file_errors)
+    else:
+        max_pending = args.workers * 4
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            pending = {}
+            job_iter = jobs()
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_pending:
+                    job = next(job_iter, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    file_path, output_dir = job
+                    future = executor.submit(convert_file, file_path, params, args.formats, user_suffix, output_dir)
+                    pending[future] = file_path
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = pending.pop(future)
+                    try:
+                        file_errors, _ = future.result()
+                    except Exception as e:
+                        file_errors = [f"{file_path}: {str(e)}"]
+                    report(file_path, file_errors)
+
+    print(f"完了: {converted} ファイル処理、エラー {len(errors)} 件")
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
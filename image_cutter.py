@@ -1,25 +1,108 @@
 import sys
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout,
-    QGridLayout, QSpinBox, QMessageBox
+    QGridLayout, QSpinBox, QMessageBox, QProgressBar
 )
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QPixmap, QImage, QPainter
+from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtGui import QPixmap, QPainter
 from PIL import Image, ImageOps
-
-def pil2pixmap(pil_image):
-    """PillowのImageオブジェクトをQPixmapに変換"""
-    rgb_image = pil_image.convert("RGB")
-    data = rgb_image.tobytes("raw", "RGB")
-    qimage = QImage(data, rgb_image.width, rgb_image.height, QImage.Format_RGB888)
-    return QPixmap.fromImage(qimage)
+from pil_qt_bridge import pil_to_qpixmap
+
+# プレビュー領域のサイズ
+PREVIEW_SIZE = (400, 300)
+# 読み込める画像の拡張子
+INPUT_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp')
+# 縮小（Image.reduce）に対応しているモード
+MIP_MODES = ("L", "LA", "RGB", "RGBA", "I", "F")
+
+def build_mip_levels(img, min_size=PREVIEW_SIZE):
+    """
+    プレビュー用のミップマップ（1/2ずつ縮小した画像の列）を作る。
+    ・先頭は元画像そのもの（縮小に対応していないモードだけ RGB/RGBA に変換したもの）
+    ・以降は直前の段を2x2平均で縮小し、min_size に収まったら終わり
+    """
+    level = img
+    if level.mode not in MIP_MODES:
+        has_alpha = "A" in level.getbands() or "transparency" in level.info
+        level = level.convert("RGBA" if has_alpha else "RGB")
+    levels = [level]
+    while level.width > min_size[0] or level.height > min_size[1]:
+        level = level.reduce(2)
+        levels.append(level)
+    return levels
+
+def clamp_crop_box(size, top, bottom, left, right):
+    """カット量を画像サイズに合わせてクランプした切り抜き範囲（無効なら None）"""
+    orig_width, orig_height = size
+    top = min(top, orig_height)
+    left = min(left, orig_width)
+    bottom = min(bottom, max(0, orig_height - top))
+    right = min(right, max(0, orig_width - left))
+    crop_box = (left, top, orig_width - right, orig_height - bottom)
+    if crop_box[0] >= crop_box[2] or crop_box[1] >= crop_box[3]:
+        return None
+    return crop_box
+
+def output_dir():
+    """出力先は実行ファイル（または.pyファイル）と同じフォルダ"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+def reserve_output_names(out_dir, source_paths):
+    """
+    各入力に「元の名前_連番.拡張子」の空いている出力パスを割り当てる。
+    フォルダの一覧は1回だけ読み、割り当て済みの名前はメモリ上で管理する（1候補ごとの存在確認はしない）。
+    """
+    used = {name.lower() for name in os.listdir(out_dir)} if os.path.isdir(out_dir) else set()
+    next_counter = {}  # (元の名前, 拡張子) → 次に試す連番
+    paths = []
+    for source_path in source_paths:
+        base, ext = os.path.splitext(os.path.basename(source_path))
+        key = (base.lower(), ext.lower())
+        counter = next_counter.get(key, 1)
+        while f"{base}_{counter}{ext}".lower() in used:
+            counter += 1
+        name = f"{base}_{counter}{ext}"
+        used.add(name.lower())
+        next_counter[key] = counter + 1
+        paths.append(os.path.join(out_dir, name))
+    return paths
+
+def cut_and_scale_file(source_path, output_path, margins, scale_percent):
+    """
+    上下左右のカットと拡大縮小を1ファイルに適用して保存する（プロセスプールのワーカーから呼ばれる）。
+    margins は (上, 下, 左, 右) のカット量(px)。
+    JPEG を縮小する場合は draft() で縮小デコードし、原寸の展開（フルサイズのIDCT）を省く。
+    """
+    with Image.open(source_path) as img:
+        crop_box = clamp_crop_box(img.size, *margins) or (0, 0) + img.size
+        new_width = int((crop_box[2] - crop_box[0]) * scale_percent / 100)
+        new_height = int((crop_box[3] - crop_box[1]) * scale_percent / 100)
+        if scale_percent < 100 and img.format == "JPEG":
+            # 書出しサイズ以上を保つ範囲で 1/2・1/4・1/8 に縮小してデコードし、切り抜き範囲も合わせて縮める
+            orig_width = img.width
+            img.draft(img.mode, (max(1, img.width * scale_percent // 100), max(1, img.height * scale_percent // 100)))
+            ratio = img.width / orig_width
+            crop_box = tuple(round(v * ratio) for v in crop_box)
+        processed_img = img.crop(crop_box).resize((new_width, new_height), Image.LANCZOS)
+    processed_img.save(output_path)
+    return output_path
 
 class ImageCutterApp(QWidget):
     def __init__(self):
         super().__init__()
         self.original_image = None  # Pillow Imageオブジェクト
+        self.preview_levels = []    # プレビュー用ミップマップ（先頭が原寸、以降 1/2 ずつ）
         self.image_path = None
+        self.executor = None  # 一括処理中のプロセスプール
+        self.pending_futures = {}  # 実行中のFuture → 入力ファイルパス
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(50)
+        self.poll_timer.timeout.connect(self.poll_batch)
         self.initUI()
 
     def initUI(self):
@@ -29,7 +112,7 @@ class ImageCutterApp(QWidget):
 
         # プレビュー領域（固定サイズ：400×300）
         self.preview_label = QLabel("プレビュー", self)
-        self.preview_label.setFixedSize(400, 300)
+        self.preview_label.setFixedSize(*PREVIEW_SIZE)
         self.preview_label.setAlignment(Qt.AlignCenter)
         # 背景は透過（※スタイルシートで設定する場合、ウィジェット自体の背景色にはならないのでQPixmap側で処理）
         self.preview_label.setStyleSheet("border: 1px solid #CCC;")
@@ -84,6 +167,23 @@ class ImageCutterApp(QWidget):
 
         main_layout.addLayout(button_layout)
 
+        # フォルダ一括処理：同じカット量・拡大縮小率をフォルダ内の全画像に適用（プロセスプールで並列処理）
+        batch_layout = QHBoxLayout()
+        self.batch_button = QPushButton("フォルダ一括処理")
+        self.batch_button.clicked.connect(self.start_batch)
+        batch_layout.addWidget(self.batch_button)
+        self.cancel_button = QPushButton("中止")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_batch)
+        batch_layout.addWidget(self.cancel_button)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        batch_layout.addWidget(self.progress_bar)
+        main_layout.addLayout(batch_layout)
+        self.batch_status = QLabel("")
+        self.batch_status.setAlignment(Qt.AlignCenter)
+        main_layout.addWidget(self.batch_status)
+
         self.setLayout(main_layout)
         self.setAcceptDrops(True)
 
@@ -95,9 +195,7 @@ class ImageCutterApp(QWidget):
 
     def dropEvent(self, event):
         files = [url.toLocalFile() for url in event.mimeData().urls()]
-        valid_files = [f for f in files if f.lower().endswith((
-            '.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'
-        ))]
+        valid_files = [f for f in files if f.lower().endswith(INPUT_EXTENSIONS)]
         if valid_files:
             self.load_image(valid_files[0])
         else:
@@ -114,43 +212,57 @@ class ImageCutterApp(QWidget):
     def load_image(self, path):
         try:
             self.original_image = Image.open(path)
+            self.original_image.load()
+            self.preview_levels = build_mip_levels(self.original_image)
             self.image_path = path
             self.process_button.setEnabled(True)
             self.update_preview()
         except Exception as e:
             QMessageBox.warning(self, "エラー", f"画像読み込みに失敗しました:\n{e}")
 
+    def current_crop_box(self):
+        return clamp_crop_box(
+            self.original_image.size, self.top_spin.value(), self.bottom_spin.value(),
+            self.left_spin.value(), self.right_spin.value()
+        )
+
     def update_preview(self):
         if self.original_image is None:
             self.preview_label.setText("画像が読み込まれていません")
             return
 
-        img = self.original_image.copy()
-        orig_width, orig_height = img.size
-
-        # カット値を画像サイズに合わせてクランプする
-        top = min(self.top_spin.value(), orig_height)
-        left = min(self.left_spin.value(), orig_width)
-        bottom = min(self.bottom_spin.value(), max(0, orig_height - top))
-        right = min(self.right_spin.value(), max(0, orig_width - left))
+        # カット値を画像サイズに合わせてクランプする（範囲が無効なら元画像のまま）
+        crop_box = self.current_crop_box() or (0, 0) + self.original_image.size
+        crop_width = crop_box[2] - crop_box[0]
+        crop_height = crop_box[3] - crop_box[1]
 
-        crop_box = (left, top, orig_width - right, orig_height - bottom)
-        if crop_box[0] >= crop_box[2] or crop_box[1] >= crop_box[3]:
-            cropped = img  # カット範囲が無効なら元画像のまま
-        else:
-            cropped = img.crop(crop_box)
-
-        # 拡大縮小適用
+        # 拡大縮小後のサイズ（決定時に書き出されるサイズ）
         scale_percent = self.scale_spin.value()
-        new_width = int(cropped.width * scale_percent / 100)
-        new_height = int(cropped.height * scale_percent / 100)
-        processed_img = cropped.resize((new_width, new_height), Image.LANCZOS)
+        new_width = max(1, int(crop_width * scale_percent / 100))
+        new_height = max(1, int(crop_height * scale_percent / 100))
+
+        # 表示に必要な解像度：プレビュー領域に収まるサイズ（書出しサイズの方が小さければそちら）
+        fit = min(PREVIEW_SIZE[0] / crop_width, PREVIEW_SIZE[1] / crop_height)
+        render_size = (max(1, min(new_width, round(crop_width * fit))),
+                       max(1, min(new_height, round(crop_height * fit))))
+
+        # 必要な解像度を満たす中で最も小さいミップマップから切り抜いて縮小する
+        # （処理量は表示サイズ程度で一定。原寸からの LANCZOS 縮小は決定時のみ）
+        factor = 1
+        level = self.preview_levels[0]
+        for candidate in self.preview_levels[1:]:
+            next_factor = factor * 2
+            if crop_width / next_factor < render_size[0] or crop_height / next_factor < render_size[1]:
+                break
+            factor, level = next_factor, candidate
+        box = tuple(min(v / factor, limit) for v, limit in zip(crop_box, level.size * 2))
+        processed_img = level.resize(render_size, Image.LANCZOS, box=box)
 
         # QPixmapに変換
-        pixmap = pil2pixmap(processed_img)
+        pixmap = pil_to_qpixmap(processed_img)
 
         # プレビュー領域（400×300）に合わせて縦横比を保ちつつ拡縮、余白は透過
-        preview_size = QSize(400, 300)
+        preview_size = QSize(*PREVIEW_SIZE)
         # 背景は透明なQPixmap
         preview_pixmap = QPixmap(preview_size)
         preview_pixmap.fill(Qt.transparent)
@@ -168,14 +280,8 @@ class ImageCutterApp(QWidget):
         if self.original_image is None:
             return
 
-        orig_width, orig_height = self.original_image.size
-        top = min(self.top_spin.value(), orig_height)
-        left = min(self.left_spin.value(), orig_width)
-        bottom = min(self.bottom_spin.value(), max(0, orig_height - top))
-        right = min(self.right_spin.value(), max(0, orig_width - left))
-
-        crop_box = (left, top, orig_width - right, orig_height - bottom)
-        if crop_box[0] >= crop_box[2] or crop_box[1] >= crop_box[3]:
+        crop_box = self.current_crop_box()
+        if crop_box is None:
             cropped = self.original_image
         else:
             cropped = self.original_image.crop(crop_box)
@@ -186,19 +292,7 @@ class ImageCutterApp(QWidget):
         processed_img = cropped.resize((new_width, new_height), Image.LANCZOS)
 
         # 出力先は実行ファイル（または.pyファイル）と同じフォルダに保存
-        if getattr(sys, 'frozen', False):
-            base_path = os.path.dirname(sys.executable)
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-
-        base, ext = os.path.splitext(os.path.basename(self.image_path))
-        output_name = f"{base}_1{ext}"
-        output_path = os.path.join(base_path, output_name)
-        counter = 1
-        while os.path.exists(output_path):
-            counter += 1
-            output_name = f"{base}_{counter}{ext}"
-            output_path = os.path.join(base_path, output_name)
+        output_path = reserve_output_names(output_dir(), [self.image_path])[0]
 
         try:
             processed_img.save(output_path)
@@ -206,7 +300,83 @@ class ImageCutterApp(QWidget):
         except Exception as e:
             QMessageBox.warning(self, "エラー", f"画像の保存に失敗しました:\n{e}")
 
+    # -------------------------------
+    # フォルダ一括処理：ProcessPoolExecutorに1ファイルずつ投入し、タイマーで完了分を回収
+    # -------------------------------
+    def start_batch(self):
+        folder = QFileDialog.getExistingDirectory(self, "一括処理するフォルダを選択")
+        if not folder:
+            return
+        sources = sorted(
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if name.lower().endswith(INPUT_EXTENSIONS)
+        )
+        if not sources:
+            QMessageBox.information(self, "情報", "フォルダに画像がありません。")
+            return
+        margins = (self.top_spin.value(), self.bottom_spin.value(), self.left_spin.value(), self.right_spin.value())
+        scale_percent = self.scale_spin.value()
+        # 出力名は投入前にまとめて割り当てる（ワーカー同士で同じ名前を取り合わない）
+        outputs = reserve_output_names(output_dir(), sources)
+        self.executor = ProcessPoolExecutor()
+        self.pending_futures = {}
+        for source_path, output_path in zip(sources, outputs):
+            future = self.executor.submit(cut_and_scale_file, source_path, output_path, margins, scale_percent)
+            self.pending_futures[future] = source_path
+        self.batch_errors = []
+        self.batch_done = 0
+        self.batch_total = len(sources)
+        self.progress_bar.setRange(0, self.batch_total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.batch_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.batch_status.setStyleSheet("")
+        self.batch_status.setText(f"処理中... 0/{self.batch_total}")
+        self.poll_timer.start()
+
+    def poll_batch(self):
+        finished = [future for future in self.pending_futures if future.done()]
+        for future in finished:
+            source_path = self.pending_futures.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                self.batch_errors.append(f"{os.path.basename(source_path)}: {e}")
+            self.batch_done += 1
+        if finished:
+            self.progress_bar.setValue(self.batch_done)
+            self.batch_status.setText(f"処理中... {self.batch_done}/{self.batch_total}")
+        if not self.pending_futures:
+            self.finish_batch()
+            if self.batch_errors:
+                QMessageBox.warning(self, "エラー", "以下の画像の処理に失敗しました:\n" + "\n".join(self.batch_errors))
+            self.batch_status.setText(f"一括処理完了: {self.batch_total - len(self.batch_errors)}/{self.batch_total} 枚を保存しました")
+
+    def cancel_batch(self):
+        if self.executor is None:
+            return
+        self.finish_batch()
+        self.batch_status.setStyleSheet("color: red;")
+        self.batch_status.setText(f"一括処理を中止しました（{self.batch_done}/{self.batch_total} 完了）")
+
+    def finish_batch(self):
+        self.poll_timer.stop()
+        # 未着手のタスクは破棄（実行中のものは終了を待たずに切り離す）
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.pending_futures = {}
+        self.batch_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.hide()
+
+    def closeEvent(self, event):
+        if self.executor is not None:
+            self.finish_batch()
+        super().closeEvent(event)
+
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # exe化した場合のプロセスプール対応
     app = QApplication(sys.argv)
     window = ImageCutterApp()
     window.show()
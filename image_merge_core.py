@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+画像連結の処理本体（PyQt5 に依存しない）
+・Image_merger.py / Image_merger_pre.py から共通で利用する
+・レイアウト（各画像の配置）は画像ヘッダのサイズだけから計算し、画素はデコードしない
+・大きなキャンバスは出力の数百行（ストリップ）ずつ組み立てて PNG に逐次書き出すため、
+  メモリはキャンバス全体ではなく「1ストリップ＋そのストリップにかかる入力画像」分で済む
+  （縦方向の連結では入力1～2枚分。横方向ではすべての入力が各ストリップにかかるため入力の合計分）
+・並べ方は横一列・縦一列のほか、R×C のグリッドと、目標の縦横比に合わせた詰め込み（シェルフ／メイソンリー）
+・画像の読み込みと貼り付けはスレッドで並列に行う（Pillow のデコード・縮小・貼り付けは GIL を解放する）
+"""
+import heapq
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+BACKGROUND = (255, 255, 255)  # 余白の色
+
+# 1回に組み立てる出力の行数
+STRIP_HEIGHT = 256
+
+# JPEG で保存できる一辺の上限（規格上は65535）と、キャンバス全体をメモリ上で組み立てる画素数の上限
+# どちらかを超える場合は JPEG ではなく PNG へ逐次書き出す
+JPEG_MAX_SIDE = 65500
+IN_MEMORY_MAX_PIXELS = 64 * 1024 * 1024
+
+# 画像の読み込み・貼り付けを並列に行うスレッド数
+MERGE_THREADS = 4
+
+# 並べ方（GUI のラジオボタンの番号と同じ）
+LAYOUT_HORIZONTAL = 0
+LAYOUT_VERTICAL = 1
+LAYOUT_GRID = 2
+LAYOUT_SHELF = 3
+LAYOUT_MASONRY = 4
+
+# 目標の縦横比の選択肢（幅 / 高さ）
+ASPECT_RATIOS = {"1:1": 1.0, "4:3": 4 / 3, "16:9": 16 / 9, "3:4": 3 / 4, "9:16": 9 / 16, "A4縦": 1 / math.sqrt(2)}
+
+# -------------------------------
+# レイアウト
+# ・layout は (キャンバスサイズ, 配置のリスト)。配置は入力と同じ順の (x, y, 幅, 高さ)
+# ・配置のサイズが元画像と異なる場合は、貼り付け時にそのサイズへ縮小する
+# -------------------------------
+def read_sizes(paths):
+    """各画像のサイズをヘッダだけから読む（Image.open は画素をデコードしない）"""
+    sizes = []
+    for path in paths:
+        with Image.open(path) as img:
+            sizes.append(img.size)
+    return sizes
+
+def linear_layout(sizes, direction):
+    """
+    1列に並べるレイアウト（direction 0：横方向、1：縦方向）
+    従来の ImageOps.pad と同じく、短い画像はセルの中央に置いて余白を白で埋める
+    """
+    if direction == 0:
+        cell_height = max(h for _, h in sizes)
+        placements = []
+        x = 0
+        for w, h in sizes:
+            placements.append((x, round((cell_height - h) * 0.5), w, h))
+            x += w
+        return (x, cell_height), placements
+    cell_width = max(w for w, _ in sizes)
+    placements = []
+    y = 0
+    for w, h in sizes:
+        placements.append((round((cell_width - w) * 0.5), y, w, h))
+        y += h
+    return (cell_width, y), placements
+
+def fit_size(size, box):
+    """box に収まるように縦横比を保って縮小したサイズ（拡大はしない）"""
+    w, h = size
+    scale = min(1.0, box[0] / w, box[1] / h)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+def grid_columns(count, cell, aspect):
+    """キャンバスの縦横比が aspect に最も近くなる列数"""
+    def error(columns):
+        rows = -(-count // columns)
+        return abs(math.log(columns * cell[0] / (rows * cell[1]) / aspect))
+    return min(range(1, count + 1), key=error)
+
+def grid_layout(sizes, columns=0, aspect=1.0, cell=None):
+    """
+    R×C のグリッド（左上から行ごとに並べる）
+    ・cell（セルの幅, 高さ）を省略すると最大の画像が入る大きさにする。大きい画像はセルに収まるよう縮小し、中央に置く
+    ・columns が0なら、キャンバスの縦横比が aspect に近くなる列数を選ぶ
+    """
+    if cell is None:
+        cell = (max(w for w, _ in sizes), max(h for _, h in sizes))
+    if columns <= 0:
+        columns = grid_columns(len(sizes), cell, aspect)
+    columns = min(columns, len(sizes))
+    rows = -(-len(sizes) // columns)
+    placements = []
+    for index, size in enumerate(sizes):
+        w, h = fit_size(size, cell)
+        row, column = divmod(index, columns)
+        placements.append((column * cell[0] + round((cell[0] - w) * 0.5),
+                           row * cell[1] + round((cell[1] - h) * 0.5), w, h))
+    return (columns * cell[0], rows * cell[1]), placements
+
+def packing_width(sizes, aspect):
+    """詰め込みの目標の幅：面積の合計から縦横比 aspect の正方形近似で決める（最大の画像の幅は下回らない）"""
+    area = sum(w * h for w, h in sizes)
+    return max(max(w for w, _ in sizes), round(math.sqrt(area * aspect)))
+
+def shelf_layout(sizes, aspect=1.0):
+    """
+    シェルフ詰め：高い順に左から並べ、目標の幅を超えたら次の段へ（各段の高さはその段で最も高い画像）
+    計算量は O(N log N) なので、数千枚のサムネイルでもすぐに終わる
+    """
+    width = packing_width(sizes, aspect)
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i][1], reverse=True)
+    placements = [None] * len(sizes)
+    x = y = shelf_height = used_width = 0
+    for index in order:
+        w, h = sizes[index]
+        if x + w > width:
+            y += shelf_height
+            x = shelf_height = 0
+        placements[index] = (x, y, w, h)
+        x += w
+        shelf_height = max(shelf_height, h)
+        used_width = max(used_width, x)
+    return (used_width, y + shelf_height), placements
+
+def masonry_layout(sizes, aspect=1.0, column_width=0):
+    """
+    メイソンリー：同じ幅の列を並べ、各画像をそのとき最も短い列の下に積む（列の幅に収まるよう縮小）
+    ・column_width が0なら最大の画像の幅にする
+    ・列数はキャンバスの縦横比が aspect に近くなるように、縮小後の高さの合計から決める
+    """
+    if column_width <= 0:
+        column_width = max(w for w, _ in sizes)
+    box = (column_width, max(h for _, h in sizes))
+    sizes = [fit_size(size, box) for size in sizes]
+    total_height = sum(h for _, h in sizes)
+    columns = max(1, min(len(sizes), round(math.sqrt(aspect * total_height / column_width))))
+    heights = [(0, column) for column in range(columns)]  # (列の高さ, 列番号) のヒープ
+    placements = []
+    for w, h in sizes:
+        y, column = heapq.heappop(heights)
+        placements.append((column * column_width + round((column_width - w) * 0.5), y, w, h))
+        heapq.heappush(heights, (y + h, column))
+    return (columns * column_width, max(y for y, _ in heights)), placements
+
+def build_layout(sizes, mode, columns=0, aspect=1.0, cell_width=0):
+    """
+    並べ方の番号からレイアウトを作る
+    ・cell_width が0より大きい場合、グリッドとシェルフでは各画像をその幅の正方形に、
+      メイソンリーではその幅の列に収まるよう縮小する（コンタクトシート用）
+    """
+    if mode in (LAYOUT_HORIZONTAL, LAYOUT_VERTICAL):
+        return linear_layout(sizes, mode)
+    if mode == LAYOUT_GRID:
+        cell = (cell_width, cell_width) if cell_width > 0 else None
+        return grid_layout(sizes, columns, aspect, cell)
+    if mode == LAYOUT_MASONRY:
+        return masonry_layout(sizes, aspect, cell_width)
+    if cell_width > 0:
+        sizes = [fit_size(size, (cell_width, cell_width)) for size in sizes]
+    return shelf_layout(sizes, aspect)
+
+def scale_layout(layout, box):
+    """
+    キャンバスが box に収まるように、レイアウト全体を同じ倍率で縮小する（プレビュー用。拡大はしない）
+    各配置の端を丸めてから幅・高さを求めるので、隣り合う画像の間に隙間や重なりができない
+    """
+    (width, height), placements = layout
+    scale = min(1.0, box[0] / width, box[1] / height)
+    scaled = []
+    for x, y, w, h in placements:
+        left, top = round(x * scale), round(y * scale)
+        scaled.append((left, top, max(1, round((x + w) * scale) - left), max(1, round((y + h) * scale) - top)))
+    canvas = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return canvas, scaled
+
+# -------------------------------
+# 合成
+# -------------------------------
+def load_placed(path, size):
+    """配置サイズの RGB 画像として読み込む（縮小する JPEG は draft() で粗くデコードしてから縮小）"""
+    with Image.open(path) as img:
+        if img.size != size:
+            img.draft("RGB", size)
+        img = img.convert("RGB")
+    if img.size != size:
+        img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
+def render_region(paths, layout, box, cache=None, executor=None):
+    """
+    キャンバスの box (left, top, right, bottom) の範囲だけを組み立てて返す
+    ・cache（dict）を渡すと、読み込んだ画像を次の呼び出しでも使い回す。
+      範囲より上で終わっている画像は cache から外す（上から順に呼ぶ前提）
+    ・executor を渡すと、範囲にかかる未読み込みの画像を並列に読み込む
+    """
+    left, top, right, bottom = box
+    region = Image.new("RGB", (right - left, bottom - top), BACKGROUND)
+    if cache is None:
+        cache = {}
+    overlapping = []
+    for index, (x, y, w, h) in enumerate(layout[1]):
+        if y + h <= top:
+            cache.pop(index, None)
+        elif y < bottom and x < right and x + w > left:
+            overlapping.append(index)
+    missing = [index for index in overlapping if index not in cache]
+    run_map = executor.map if executor is not None else map
+    cache.update(zip(missing, run_map(load_placed, [paths[i] for i in missing],
+                                      [layout[1][i][2:] for i in missing])))
+    for index in overlapping:
+        x, y, w, h = layout[1][index]
+        src = (max(left, x) - x, max(top, y) - y, min(right, x + w) - x, min(bottom, y + h) - y)
+        region.paste(cache[index].crop(src), (max(left, x) - left, max(top, y) - top))
+    return region
+
+def composite(paths, layout, threads=MERGE_THREADS):
+    """
+    キャンバス全体をメモリ上で組み立てる（小さいキャンバス・プレビュー用）
+    画像どうしは重ならないので、各スレッドが読み込んだ画像を自分の配置へ直接貼り付ける
+    """
+    canvas = Image.new("RGB", layout[0], BACKGROUND)
+
+    def paste(path, placement):
+        x, y, w, h = placement
+        canvas.paste(load_placed(path, (w, h)), (x, y))
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(paste, paths, layout[1]))  # list() で例外を呼び出し元へ伝える
+    return canvas
+
+# -------------------------------
+# PNG の逐次書き出し
+# ・IDAT はストリップごとに zlib の圧縮オブジェクトへ流し込み、出てきた分だけ書き出す
+# ・各行の先頭にはフィルタ種別（0：なし）の1バイトを付ける
+# ・「保存先.part」に書き込み、全行を書き終えたら保存先へ置き換える（途中で失敗したら .part を削除する）
+# -------------------------------
+class StreamingPngWriter:
+    def __init__(self, path, size, compress_level=6):
+        self.width, self.height = size
+        self.rows = 0
+        self.compressor = zlib.compressobj(compress_level)
+        self.path = path
+        self.part_path = path + ".part"
+        self.fp = open(self.part_path, "wb")
+        self.fp.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self.fp.write(struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data)))
+
+    def write_strip(self, strip):
+        """幅がキャンバスと同じ RGB 画像を、続きの行として書き出す"""
+        stride = self.width * 3
+        # 1行 = 1画素1バイトの L 画像として扱い、左端に1列足してフィルタ種別の0を入れる（行ごとのループを避ける）
+        rows = Image.frombuffer("L", (stride, strip.height), strip.tobytes(), "raw", "L", 0, 1)
+        filtered = Image.new("L", (stride + 1, strip.height), 0)
+        filtered.paste(rows, (1, 0))
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows += strip.height
+
+    def close(self):
+        """全行を書き終えていれば保存先へ置き換える。途中なら書きかけの .part を削除して例外にする"""
+        if self.fp is None:
+            return
+        try:
+            if self.rows != self.height:
+                raise OSError(f"PNG の書き出しが途中で終わりました（{self.rows}/{self.height} 行）")
+            self._chunk(b"IDAT", self.compressor.flush())
+            self._chunk(b"IEND", b"")
+            self.fp.close()
+            self.fp = None
+            os.replace(self.part_path, self.path)
+        except Exception:
+            self.discard()
+            raise
+
+    def discard(self):
+        """書きかけのファイルを削除する"""
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+def stream_to_png(paths, layout, save_path, strip_height=STRIP_HEIGHT, threads=MERGE_THREADS):
+    """キャンバスを上からストリップ単位で組み立て、PNG へ逐次書き出す"""
+    width, height = layout[0]
+    cache = {}
+    with StreamingPngWriter(save_path, (width, height)) as writer, \
+            ThreadPoolExecutor(max_workers=threads) as executor:
+        for top in range(0, height, strip_height):
+            bottom = min(top + strip_height, height)
+            writer.write_strip(render_region(paths, layout, (0, top, width, bottom), cache, executor))
+
+def fits_in_memory(layout):
+    """キャンバス全体をメモリ上で組み立てて JPEG に保存してよいか"""
+    width, height = layout[0]
+    return max(width, height) <= JPEG_MAX_SIDE and width * height <= IN_MEMORY_MAX_PIXELS
+
+def merged_path(paths, layout):
+    """保存先（最初の画像のフォルダ）。大きいキャンバスは逐次書き出しできる PNG にする"""
+    ext = ".jpg" if fits_in_memory(layout) else ".png"
+    return os.path.join(os.path.dirname(paths[0]), f"merged_image_{len(paths)}{ext}")
+
+def save_merged(paths, layout, save_path):
+    """レイアウトどおりに連結して保存する（JPEG はキャンバス全体、PNG はストリップ単位で組み立てる）"""
+    if save_path.lower().endswith(".png"):
+        stream_to_png(paths, layout, save_path)
+    else:
+        composite(paths, layout).save(save_path)
@@ -1,13 +1,337 @@
 import sys
 import os
+import json
+import math
+import hashlib
 import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, 
-    QHBoxLayout, QSpinBox, QLineEdit, QMessageBox
+    QHBoxLayout, QSpinBox, QLineEdit, QMessageBox, QCheckBox, QProgressBar, QListWidget, QComboBox
 )
 from PyQt5.QtCore import Qt, QTimer, QRectF
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QPixmap, QPainter, QPen
-from PIL import Image
+from PIL import Image, __version__ as PILLOW_VERSION
+from pil_qt_bridge import pil_to_qpixmap
+
+# 1枚の画像のタイルを並行して保存するスレッド数（PNG/JPEG の符号化中は GIL が解放される）
+TILE_WRITER_THREADS = 4
+# プレビュー用に縮小して読み込む最大サイズ（これより大きい画像は元サイズで展開しない）
+PREVIEW_MAX_SIZE = (2048, 2048)
+# 読み込める画像の拡張子（BMP/TIFF は省メモリ分割で帯ごとに読み込める。PNG/JPEG は全体を1回デコードする）
+INPUT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+# ピラミッド書出しのタイルサイズと、前回書き出したタイルのハッシュを記録するファイル名
+PYRAMID_TILE_SIZE = 256
+PYRAMID_HASH_FILE = "tile_hashes.json"
+
+# -------------------------------------------------------
+# 分割処理（GUIに依存しない関数。プロセスプールのワーカーからも呼ばれる）
+# -------------------------------------------------------
+def tile_boxes(width, height, h_splits, v_splits):
+    """画像サイズを等分割したタイル範囲 (left, upper, right, lower) を左上から行ごとに返す（最終行・列は余りを含める）"""
+    h_step = width // h_splits
+    v_step = height // v_splits
+    boxes = []
+    for v in range(v_splits):
+        for h in range(h_splits):
+            left = h * h_step
+            upper = v * v_step
+            right = (h + 1) * h_step if h != h_splits - 1 else width
+            lower = (v + 1) * v_step if v != v_splits - 1 else height
+            boxes.append((left, upper, right, lower))
+    return boxes
+
+def tile_path(file_path, custom_suffix, counter):
+    """タイルの保存先（元画像と同じフォルダに「元の名前_接尾辞連番.拡張子」）"""
+    img_dir = os.path.dirname(file_path)
+    img_name, img_ext = os.path.splitext(os.path.basename(file_path))
+    return os.path.join(img_dir, f"{img_name}_{custom_suffix}{counter}{img_ext}")
+
+def tile_writer_threads(file_path, threads):
+    """
+    タイルを保存するスレッド数。タイルは元画像と同じ形式で保存するが、
+    圧縮TIFFの符号化（libtiff）は Pillow 10 以前では並行に実行すると失敗するため、TIFF は1スレッドで保存する
+    """
+    return 1 if file_path.lower().endswith(('.tif', '.tiff')) else threads
+
+def split_file(file_path, h_splits, v_splits, custom_suffix="", threads=TILE_WRITER_THREADS, low_memory=False):
+    """
+    画像を h_splits x v_splits に等分割して保存し、保存したタイル数を返す。
+    デコードは1回だけ行い、タイルの切り出し・保存はスレッドで並行に行う。
+    low_memory=True ならタイル1行分の帯ずつ読み込む（split_file_strips）。
+    """
+    if low_memory:
+        return split_file_strips(file_path, h_splits, v_splits, custom_suffix, threads)
+    with Image.open(file_path) as img:
+        img.load()
+        boxes = tile_boxes(img.width, img.height, h_splits, v_splits)
+
+        def save_tile(counter, box):
+            img.crop(box).save(tile_path(file_path, custom_suffix, counter))
+
+        with ThreadPoolExecutor(max_workers=tile_writer_threads(file_path, threads)) as executor:
+            futures = [executor.submit(save_tile, counter, box) for counter, box in enumerate(boxes, 1)]
+            for future in futures:
+                future.result()  # 保存に失敗したタイルがあれば例外を呼び出し元へ
+    return len(boxes)
+
+# -------------------------------------------------------
+# 省メモリ分割（巨大画像向け）
+# ・Pillow はファイルを「タイル」（デコード単位）の並びとして読み込むため、
+#   指定した行範囲に掛かるタイルだけを残して読み込めば、画像の一部だけをデコードできる
+# ・非圧縮（BMP/PPM/TGA/非圧縮TIFF）は1行単位で読み込める。圧縮データのタイルは丸ごと読み込む
+# ・PNG・JPEG・圧縮TIFF（libtiff で読む場合は全体で1タイル）は帯に分けられず、全体を1回だけデコードする
+#   （Pillow のデコーダは途中の行から再開できず、分割では縮小しないため JPEG の draft も使えない）
+# ・Pillow には画像の一部だけを読み込む公開APIがないため、帯の読み込みは内部属性を使う _decode_band に限り、
+#   動作を確認した版（PARTIAL_DECODE_PILLOW）以外では全体をデコードする
+# -------------------------------------------------------
+PARTIAL_DECODE_PILLOW = ((9, 5), (13, 0))  # 帯の読み込みを使う Pillow の版の範囲 [下限, 上限)
+
+def partial_decode_supported():
+    version = tuple(int(part) for part in PILLOW_VERSION.split(".")[:2])
+    low, high = PARTIAL_DECODE_PILLOW
+    return low <= version < high
+
+def _raw_stride(mode, rawmode, width):
+    """非圧縮データ1行のバイト数（求められなければ None）"""
+    try:
+        return len(Image.new(mode, (width, 1)).tobytes("raw", rawmode))
+    except Exception:
+        return None
+
+def _tile_like(tile, *values):
+    """tile と同じ型のタイル情報を作る（Pillow 11 以降は名前付きタプル）"""
+    return type(tile)(*values) if hasattr(tile, "_replace") else tuple(values)
+
+def _band_tiles(img, top, bottom):
+    """
+    行範囲 [top, bottom) を読み込むためのタイル列と、実際にデコードされる行範囲 (dtop, dbottom) を返す。
+    非圧縮タイルは行範囲で切り詰め、それ以外のタイルは丸ごと読み込む（その分だけ範囲が広がる）。
+    """
+    selected = []
+    dtop, dbottom = top, bottom
+    for tile in img.tile:
+        codec, (x0, y0, x1, y1), offset, args = tile[:4]
+        if y1 <= top or y0 >= bottom:
+            continue
+        if codec == "raw":
+            rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+            stride = stride or _raw_stride(img.mode, rawmode, x1 - x0)
+            if stride and orientation in (1, -1):
+                r0, r1 = max(top, y0), min(bottom, y1)
+                skip = (r0 - y0) if orientation == 1 else (y1 - r1)
+                selected.append(_tile_like(tile, "raw", (x0, r0, x1, r1), offset + skip * stride,
+                                           (rawmode, stride, orientation)))
+                continue
+        selected.append(tile)
+        dtop, dbottom = min(dtop, y0), max(dbottom, y1)
+    return selected, dtop, dbottom
+
+def _decode_band(img, tiles, dtop, dbottom):
+    """
+    開いただけの img を、行範囲 [dtop, dbottom) の高さの画像としてタイル列 tiles からデコードする。
+    画像の高さは Pillow の内部属性（_size）なので、ここ以外では書き換えない。
+    """
+    img._size = (img.width, dbottom - dtop)
+    img.tile = [_tile_like(tile, codec, (x0, y0 - dtop, x1, y1 - dtop), offset, args)
+                for tile in tiles for codec, (x0, y0, x1, y1), offset, args in [tile[:4]]]
+    img.load()
+
+def load_rows(file_path, top, bottom):
+    """画像の行範囲 [top, bottom) を含む帯をデコードし、(帯の画像, 帯の先頭行) を返す"""
+    # ファイルオブジェクトで開くと Pillow はメモリマップを使わない
+    # （メモリマップで読むと先読みでファイル全体が常駐メモリに載ることがあるため、帯は通常のメモリに読み込む）
+    with open(file_path, "rb") as fp:
+        img = Image.open(fp)
+        tiles, dtop, dbottom = _band_tiles(img, top, bottom)
+        if (dtop, dbottom) == (0, img.height) or not partial_decode_supported():
+            img.load()  # 帯に分けられない形式：全体をデコード
+            return img, 0
+        _decode_band(img, tiles, dtop, dbottom)
+        return img, dtop
+
+def strip_decodable(file_path):
+    """省メモリ分割で帯ごとに読み込める画像か（False なら全体を1回デコードする）"""
+    if not partial_decode_supported():
+        return False
+    with Image.open(file_path) as img:
+        _, dtop, dbottom = _band_tiles(img, 0, 1)
+        return img.height <= 1 or (dtop, dbottom) != (0, img.height)
+
+def split_file_job(file_path, h_splits, v_splits, custom_suffix="", low_memory=False):
+    """
+    プロセスプールで実行する分割。(保存したタイル数, 0, 全体を読み込んだか) を返す。
+    省メモリ分割で帯に分けられない形式だったかどうかも、ワーカー側で調べて返す。
+    """
+    full_decode = low_memory and not strip_decodable(file_path)
+    return split_file(file_path, h_splits, v_splits, custom_suffix, low_memory=low_memory), 0, full_decode
+
+def split_file_strips(file_path, h_splits, v_splits, custom_suffix="", threads=TILE_WRITER_THREADS):
+    """
+    split_file の省メモリ版。タイル1行分の帯をデコードしてはその行のタイルを保存し、帯を破棄する。
+    ピークメモリはおおよそ帯1本分（帯に分けられない形式（PNG・JPEG など）では画像全体）。
+    """
+    with Image.open(file_path) as src:
+        width, height = src.size  # ヘッダのみ読み込み
+    boxes = tile_boxes(width, height, h_splits, v_splits)
+    band = None  # (帯の画像, 先頭行, 末尾行)
+    try:
+        with ThreadPoolExecutor(max_workers=tile_writer_threads(file_path, threads)) as executor:
+            for row in range(v_splits):
+                row_boxes = boxes[row * h_splits:(row + 1) * h_splits]
+                top, bottom = row_boxes[0][1], row_boxes[0][3]
+                if band is None or not (band[1] <= top and bottom <= band[2]):
+                    if band is not None:
+                        band[0].close()  # 次の帯を読む前に前の帯を解放する
+                    band = strip = None
+                    strip, dtop = load_rows(file_path, top, bottom)
+                    band = (strip, dtop, dtop + strip.height)
+                strip, dtop = band[0], band[1]
+
+                def save_tile(counter, box):
+                    left, upper, right, lower = box
+                    strip.crop((left, upper - dtop, right, lower - dtop)).save(
+                        tile_path(file_path, custom_suffix, counter))
+
+                futures = [executor.submit(save_tile, row * h_splits + i + 1, box)
+                           for i, box in enumerate(row_boxes)]
+                for future in futures:
+                    future.result()
+    finally:
+        if band is not None:
+            band[0].close()
+    return len(boxes)
+
+# -------------------------------------------------------
+# ピラミッド（Deep Zoom）書出し
+# ・DZI: 「名前.dzi」と「名前_files/レベル/列_行.拡張子」（レベル0が1x1、最大レベルが原寸）
+# ・XYZ: 「名前_xyz/z/x/y.拡張子」（z=0 が1タイルに収まる縮小、最大 z が原寸）
+# ・各レベルは元画像を読み直さず、1つ上のレベルを 1/2 に縮小（2x2平均）して作る
+# ・タイルの内容のハッシュを記録しておき、再実行時に内容が変わらないタイルは書き込まない
+#   （画像サイズ・タイル設定が前回と違えば記録は使わず、今回のピラミッドに含まれない古いタイルは削除する）
+# -------------------------------------------------------
+def pyramid_levels(level, min_size=1):
+    """
+    原寸から 1/2 ずつ縮小したレベル画像を大きい順に返す。
+    呼び出し側が原寸の画像への参照を手放していれば、保持されるのは縮小中の2レベル分のみ。
+    """
+    yield level
+    while max(level.size) > min_size:
+        level = level.reduce(2)
+        yield level
+
+def pyramid_output_paths(file_path, layout):
+    """(タイルの出力フォルダ, DZIのXMLファイル（XYZはNone）, タイルの拡張子)"""
+    img_dir = os.path.dirname(file_path)
+    img_name, img_ext = os.path.splitext(os.path.basename(file_path))
+    tile_ext = ".jpg" if img_ext.lower() in (".jpg", ".jpeg") else ".png"
+    if layout == "dzi":
+        return os.path.join(img_dir, f"{img_name}_files"), os.path.join(img_dir, f"{img_name}.dzi"), tile_ext
+    return os.path.join(img_dir, f"{img_name}_xyz"), None, tile_ext
+
+def is_pyramid_tile(rel_path, layout):
+    """出力フォルダからの相対パスが、export_pyramid の書き出すタイルの名前か"""
+    parts = rel_path.split(os.sep)
+    stem, ext = os.path.splitext(parts[-1])
+    if ext not in (".png", ".jpg") or not all(part.isdigit() for part in parts[:-1]):
+        return False
+    if layout == "dzi":
+        col, _, row = stem.partition("_")
+        return len(parts) == 2 and col.isdigit() and row.isdigit()
+    return len(parts) == 3 and stem.isdigit()
+
+def remove_stale_tiles(out_dir, layout, keep):
+    """今回書き出していないタイル（前回の別サイズ・別形式のもの）と、空になったレベルのフォルダを削除する"""
+    removed = 0
+    for dir_path, _, file_names in os.walk(out_dir, topdown=False):
+        for file_name in file_names:
+            rel_path = os.path.relpath(os.path.join(dir_path, file_name), out_dir)
+            if rel_path not in keep and is_pyramid_tile(rel_path, layout):
+                os.remove(os.path.join(dir_path, file_name))
+                removed += 1
+        if dir_path != out_dir and os.path.basename(dir_path).isdigit() and not os.listdir(dir_path):
+            os.rmdir(dir_path)
+    return removed
+
+def export_pyramid(file_path, layout="dzi", tile_size=PYRAMID_TILE_SIZE, threads=TILE_WRITER_THREADS):
+    """
+    画像をタイルピラミッドとして書き出し、(書き込んだタイル数, 変化がなく省いたタイル数) を返す。
+    layout は "dzi" または "xyz"。DZI はタイル同士を1ピクセル重ねる（Deep Zoom の標準）。
+    """
+    out_dir, dzi_path, tile_ext = pyramid_output_paths(file_path, layout)
+    overlap = 1 if layout == "dzi" else 0
+    save_options = {"quality": 90} if tile_ext == ".jpg" else {}
+    with Image.open(file_path) as src:
+        has_alpha = "A" in src.getbands() or "transparency" in src.info
+        img = src.convert("RGBA" if has_alpha and tile_ext == ".png" else "RGB")
+    width, height = img.size
+
+    # 前回の記録は、画像サイズ・タイル設定が同じ場合だけ使う
+    descriptor = {"width": width, "height": height, "tile_size": tile_size, "overlap": overlap,
+                  "format": tile_ext[1:], "mode": img.mode}
+    hash_path = os.path.join(out_dir, PYRAMID_HASH_FILE)
+    try:
+        with open(hash_path, encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        record = {}
+    old_hashes = record.get("tiles", {}) if record.get("descriptor") == descriptor else {}
+    new_hashes = {}
+    max_level = max(0, math.ceil(math.log2(max(width, height))))  # DZI の最大レベル（原寸）
+    # XYZ は1タイルに収まるところまでで打ち切る
+    min_size = tile_size if layout == "xyz" else 1
+    top_z = max(0, math.ceil(math.log2(max(width, height) / tile_size))) if layout == "xyz" else max_level
+
+    def write_tile(level_img, level_dir, col, row):
+        left = col * tile_size - (overlap if col > 0 else 0)
+        upper = row * tile_size - (overlap if row > 0 else 0)
+        right = min((col + 1) * tile_size + overlap, level_img.width)
+        lower = min((row + 1) * tile_size + overlap, level_img.height)
+        tile = level_img.crop((left, upper, right, lower))
+        if layout == "dzi":
+            rel_path = os.path.join(level_dir, f"{col}_{row}{tile_ext}")
+        else:
+            rel_path = os.path.join(level_dir, str(col), f"{row}{tile_ext}")
+        digest = hashlib.sha1(tile.tobytes()).hexdigest() + f":{tile.mode}:{tile.size}"
+        new_hashes[rel_path] = digest
+        path = os.path.join(out_dir, rel_path)
+        if old_hashes.get(rel_path) == digest and os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tile.save(path, **save_options)
+        return True
+
+    written = skipped = 0
+    levels = pyramid_levels(img, min_size)
+    del img  # 原寸の画像は最初の縮小が済んだ時点で解放させる（以降はレベルの生成側だけが参照する）
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for depth, level_img in enumerate(levels):
+            level_dir = str(top_z - depth)
+            cols = math.ceil(level_img.width / tile_size)
+            rows = math.ceil(level_img.height / tile_size)
+            futures = [executor.submit(write_tile, level_img, level_dir, col, row)
+                       for row in range(rows) for col in range(cols)]
+            for future in futures:
+                if future.result():
+                    written += 1
+                else:
+                    skipped += 1
+
+    remove_stale_tiles(out_dir, layout, new_hashes)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(hash_path, "w", encoding="utf-8") as f:
+        json.dump({"descriptor": descriptor, "tiles": new_hashes}, f, indent=0, sort_keys=True)
+    if dzi_path is not None:
+        with open(dzi_path, "w", encoding="utf-8") as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tile_size}" '
+                f'Overlap="{overlap}" Format="{tile_ext[1:]}">\n'
+                f'  <Size Width="{width}" Height="{height}"/>\n'
+                '</Image>\n'
+            )
+    return written, skipped
 
 class ImagePreviewWidget(QLabel):
     def __init__(self, parent=None):
@@ -18,7 +342,13 @@ class ImagePreviewWidget(QLabel):
         self.v_splits = 1
 
     def setImage(self, image_path):
-        self.original_pix = QPixmap(image_path)
+        with Image.open(image_path) as img:
+            if img.width <= PREVIEW_MAX_SIZE[0] and img.height <= PREVIEW_MAX_SIZE[1]:
+                self.original_pix = QPixmap(image_path)
+            else:
+                # 巨大画像は縮小して読み込む（JPEG は draft で縮小デコードされる）
+                img.thumbnail(PREVIEW_MAX_SIZE)
+                self.original_pix = pil_to_qpixmap(img)
         self.updatePixmap()
         
     def updatePixmap(self):
@@ -75,6 +405,11 @@ class ImageSplitterApp(QWidget):
     def __init__(self):
         super().__init__()
         self.file_paths = []  # 読み込んだ画像ファイルのリスト
+        self.executor = None  # 並列分割中のプロセスプール
+        self.pending_futures = {}  # 実行中のFuture → ファイルパス
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(50)
+        self.poll_timer.timeout.connect(self.poll_split)
         self.initUI()
 
     def initUI(self):
@@ -123,15 +458,64 @@ class ImageSplitterApp(QWidget):
         hbox_suffix.addWidget(self.suffix_line)
         layout.addLayout(hbox_suffix)
 
+        # 並列処理の設定（複数画像をプロセスプールで同時に分割。オフでもワーカー1つでバックグラウンド分割）
+        hbox_parallel = QHBoxLayout()
+        self.cb_parallel = QCheckBox("並列処理", self)
+        self.cb_parallel.setChecked(True)
+        hbox_parallel.addWidget(self.cb_parallel)
+        hbox_parallel.addWidget(QLabel("ワーカー数:", self))
+        self.worker_spin = QSpinBox(self)
+        self.worker_spin.setRange(1, 64)
+        self.worker_spin.setValue(os.cpu_count() or 1)
+        self.cb_parallel.toggled.connect(self.worker_spin.setEnabled)
+        hbox_parallel.addWidget(self.worker_spin)
+        self.cb_low_memory = QCheckBox("省メモリ（巨大画像）", self)
+        self.cb_low_memory.setToolTip(
+            "タイル1行分ずつ読み込んで保存します（BMP・TIFF で有効）。\n"
+            "PNG・JPEG などは帯に分けて読み込めないため、画像全体を読み込みます"
+        )
+        hbox_parallel.addWidget(self.cb_low_memory)
+        hbox_parallel.addStretch()
+        layout.addLayout(hbox_parallel)
+
         # ファイル選択ボタン
         self.btn_select = QPushButton('ファイルを選択', self)
         self.btn_select.clicked.connect(self.open_file_dialog)
         layout.addWidget(self.btn_select)
 
-        # 分割実行ボタン
+        # 分割実行ボタンと中止ボタン
+        hbox_buttons = QHBoxLayout()
         self.btn_split = QPushButton('画像を分割', self)
         self.btn_split.clicked.connect(self.execute_split)
-        layout.addWidget(self.btn_split)
+        hbox_buttons.addWidget(self.btn_split)
+        self.btn_cancel = QPushButton('中止', self)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_split)
+        hbox_buttons.addWidget(self.btn_cancel)
+        layout.addLayout(hbox_buttons)
+
+        # ピラミッド（Deep Zoom）書出し：分割数の設定は使わず、256pxタイルの多段解像度で書き出す
+        hbox_pyramid = QHBoxLayout()
+        hbox_pyramid.addWidget(QLabel("ピラミッド形式:", self))
+        self.pyramid_combo = QComboBox(self)
+        self.pyramid_combo.addItem("DZI (Deep Zoom)", "dzi")
+        self.pyramid_combo.addItem("XYZ (z/x/y)", "xyz")
+        hbox_pyramid.addWidget(self.pyramid_combo)
+        self.btn_pyramid = QPushButton('ピラミッド書出し', self)
+        self.btn_pyramid.setToolTip("Webビューア用のタイルピラミッドを書き出します（内容が変わらないタイルは上書きしません）")
+        self.btn_pyramid.clicked.connect(self.execute_pyramid)
+        hbox_pyramid.addWidget(self.btn_pyramid)
+        layout.addLayout(hbox_pyramid)
+
+        # 並列分割の進捗とファイルごとのエラー一覧（分割中のみ表示）
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar)
+        self.error_list = QListWidget(self)
+        self.error_list.setFixedHeight(80)
+        self.error_list.setStyleSheet("color: red;")
+        self.error_list.hide()
+        layout.addWidget(self.error_list)
 
         # ステータスラベル（分割成功メッセージ等）
         self.status_label = QLabel("", self)
@@ -163,7 +547,7 @@ class ImageSplitterApp(QWidget):
 
     def dropEvent(self, event: QDropEvent):
         files = [url.toLocalFile() for url in event.mimeData().urls()]
-        valid_files = [f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+        valid_files = [f for f in files if f.lower().endswith(INPUT_EXTENSIONS)]
         if valid_files:
             self.file_paths = valid_files  # 複数の場合はすべて保持
             self.updateCountLabel()
@@ -177,7 +561,7 @@ class ImageSplitterApp(QWidget):
 
     def open_file_dialog(self):
         files, _ = QFileDialog.getOpenFileNames(
-            self, "画像ファイルを選択", "", "Image Files (*.png *.jpg *.jpeg)"
+            self, "画像ファイルを選択", "", "Image Files (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)"
         )
         if files:
             self.file_paths = files
@@ -205,48 +589,111 @@ class ImageSplitterApp(QWidget):
             if reply != QMessageBox.Yes:
                 return
 
-        # 各画像に対して分割処理を実行
-        for file_path in self.file_paths:
-            self.split_image(file_path)
-        # 分割成功メッセージを表示（数秒後に自動クリア）
-        self.status_label.setText("分割成功！")
-        QTimer.singleShot(3000, lambda: self.status_label.setText(""))
-
-    def split_image(self, file_path):
-        h_splits = self.h_spin.value()
-        v_splits = self.v_spin.value()
-
-        # PILを使用して画像を読み込み、画像サイズで等分割（余白は考慮しない）
-        img = Image.open(file_path)
-        width, height = img.size
-
-        # 画像のディレクトリとファイル名取得
-        img_dir = os.path.dirname(file_path)
-        img_name, img_ext = os.path.splitext(os.path.basename(file_path))
-
-        h_step = width // h_splits
-        v_step = height // v_splits
-
-        custom_suffix = self.suffix_line.text().strip()
-
-        counter = 1
-        for v in range(v_splits):
-            for h in range(h_splits):
-                left = h * h_step
-                upper = v * v_step
-                # 最終行・最終列は余りを含める
-                right = (h + 1) * h_step if h != h_splits - 1 else width
-                lower = (v + 1) * v_step if v != v_splits - 1 else height
+        # プロセスプールでバックグラウンド分割（並列処理がオフならワーカー1つで1枚ずつ）
+        self.start_parallel_split(
+            "分割", split_file_job, self.h_spin.value(), self.v_spin.value(),
+            self.suffix_line.text().strip(), low_memory=self.cb_low_memory.isChecked()
+        )
 
-                cropped_img = img.crop((left, upper, right, lower))
-                suffix_part = f"{custom_suffix}" if custom_suffix else ""
-                new_filename = f"{img_name}_{suffix_part}{counter}{img_ext}"
-                save_path = os.path.join(img_dir, new_filename)
-                cropped_img.save(save_path)
-                print(f"保存: {save_path}")
-                counter += 1
+    def show_split_result(self, errors, job_name="分割", detail=""):
+        if errors:
+            QMessageBox.warning(self, f"{job_name}エラー", f"以下のファイルの{job_name}に失敗しました:\n" + "\n".join(errors))
+            return
+        # 成功メッセージを表示（数秒後に自動クリア）
+        self.status_label.setStyleSheet("")
+        self.status_label.setText(f"{job_name}成功！{detail}")
+        QTimer.singleShot(3000, lambda: self.status_label.setText(""))
 
-        print(f"画像 {file_path} を {h_splits} x {v_splits} に分割して保存しました！")
+    def execute_pyramid(self):
+        if not self.file_paths:
+            QMessageBox.information(self, "情報", "画像が読み込まれていません。")
+            return
+        # ピラミッドは1枚でも時間がかかるため、常にプロセスプールでバックグラウンド実行
+        self.start_parallel_split("ピラミッド書出し", export_pyramid, self.pyramid_combo.currentData())
+
+    # -------------------------------
+    # 並列分割：ProcessPoolExecutorに1ファイルずつ投入し、タイマーで完了分を回収
+    # task(ファイルパス, *args, **kwargs) は保存したタイル数、または (書き込んだ数, 省いた数[, 全体を読み込んだか]) を返す
+    # -------------------------------
+    def start_parallel_split(self, job_name, task, *args, **kwargs):
+        workers = self.worker_spin.value() if self.cb_parallel.isChecked() else 1
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.pending_futures = {}
+        for file_path in self.file_paths:
+            future = self.executor.submit(task, file_path, *args, **kwargs)
+            self.pending_futures[future] = file_path
+        self.job_name = job_name
+        self.split_errors = []
+        self.split_done = 0
+        self.split_total = len(self.file_paths)
+        self.tiles_written = 0
+        self.tiles_skipped = 0
+        self.full_decode_files = 0  # 省メモリ分割で帯に分けられず、全体を読み込んだ画像の数
+        self.progress_bar.setRange(0, self.split_total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.error_list.clear()
+        self.error_list.hide()
+        self.btn_split.setEnabled(False)
+        self.btn_pyramid.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.status_label.setStyleSheet("")
+        self.status_label.setText(f"{self.job_name}中... 0/{self.split_total}")
+        self.poll_timer.start()
+
+    def poll_split(self):
+        finished = [future for future in self.pending_futures if future.done()]
+        for future in finished:
+            file_path = self.pending_futures.pop(future)
+            try:
+                result = future.result()
+                if not isinstance(result, tuple):
+                    result = (result, 0)
+                written, skipped, full_decode = (result + (False,))[:3]
+                self.tiles_written += written
+                self.tiles_skipped += skipped
+                self.full_decode_files += bool(full_decode)
+                print(f"画像 {file_path} の{self.job_name}が完了しました！")
+            except Exception as e:
+                # エラーは届いた時点で一覧に追加する
+                msg = f"{file_path}: {str(e)}"
+                self.split_errors.append(msg)
+                self.error_list.addItem(msg)
+                self.error_list.show()
+            self.split_done += 1
+        if finished:
+            self.progress_bar.setValue(self.split_done)
+            self.status_label.setText(
+                f"{self.job_name}中... {self.split_done}/{self.split_total}（タイル {self.tiles_written} 枚保存）"
+            )
+        if not self.pending_futures:
+            self.finish_parallel_split()
+            detail = f"（変化のないタイル {self.tiles_skipped} 枚は省略）" if self.tiles_skipped else ""
+            if self.full_decode_files:
+                detail += f"（{self.full_decode_files} 件は PNG・JPEG など帯に分けられない形式のため全体を読み込みました）"
+            self.show_split_result(self.split_errors, self.job_name, detail)
+
+    def cancel_split(self):
+        if self.executor is None:
+            return
+        self.finish_parallel_split()
+        self.status_label.setStyleSheet("color: red;")
+        self.status_label.setText(f"{self.job_name}を中止しました（{self.split_done}/{self.split_total} 完了）")
+
+    def finish_parallel_split(self):
+        self.poll_timer.stop()
+        # 未着手のタスクは破棄（実行中のものは終了を待たずに切り離す）
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.pending_futures = {}
+        self.btn_split.setEnabled(True)
+        self.btn_pyramid.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+
+    def closeEvent(self, event):
+        if self.executor is not None:
+            self.finish_parallel_split()
+        super().closeEvent(event)
 
 # -------------------------------------------------------
 # グローバル例外ハンドラ
@@ -264,6 +711,7 @@ def excepthook(exc_type, exc_value, exc_tb):
 sys.excepthook = excepthook
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # exe化した場合のプロセスプール対応
     app = QApplication(sys.argv)
     ex = ImageSplitterApp()
     ex.show()
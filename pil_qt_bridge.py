@@ -0,0 +1,35 @@
+# -------------------------------------------------------
+# PIL Image → QImage / QPixmap 変換（各Qtツール共通）
+# ・画素は tobytes() で1回だけコピーし、そのバッファを QImage から参照する
+#   （QImage はバッファを参照するだけなので、バッファを QImage の属性に持たせて寿命をそろえる）
+# ・RGBA/RGB/L/I;16 は Qt に同じ並びの形式があるため、モード変換なしでコピーする
+#   RGB は tobytes() で3バイト/画素に詰めて Format_RGB888 として参照する
+# -------------------------------------------------------
+from PyQt5.QtGui import QImage, QPixmap
+
+# Pillow のモード → (QImageの形式, 1画素のバイト数)
+QT_FORMATS = {
+    "RGBA": (QImage.Format_RGBA8888, 4),
+    "RGB": (QImage.Format_RGB888, 3),
+    "L": (QImage.Format_Grayscale8, 1),
+    "I;16": (QImage.Format_Grayscale16, 2),
+}
+
+def pil_to_qimage(img):
+    """
+    PIL Image を QImage に変換する。
+    ・RGBA/RGB/L/I;16 はそのまま、その他のモードは RGB（透過があれば RGBA）に変換してからコピーする
+    ・返した QImage は変換時にコピーした画素を参照するため、元画像はすぐ破棄・変更してよい
+    """
+    if img.mode not in QT_FORMATS:
+        has_alpha = "A" in img.getbands() or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    qt_format, pixel_bytes = QT_FORMATS[img.mode]
+    data = img.tobytes()
+    qimage = QImage(data, img.width, img.height, img.width * pixel_bytes, qt_format)
+    qimage._buffer = data  # QImage はバッファを参照するだけなので、寿命をそろえる
+    return qimage
+
+def pil_to_qpixmap(img):
+    """PIL Image を QPixmap に変換する（QPixmap が画素をコピーするため、元画像はすぐ破棄してよい）"""
+    return QPixmap.fromImage(pil_to_qimage(img))